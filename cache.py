@@ -0,0 +1,130 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import threading
+from collections import OrderedDict
+
+def nbytes(value):
+    ''' Memory used by a value, for anything with an nbytes attribute (numpy arrays) '''
+    return getattr(value, 'nbytes', 0)
+
+def format_bytes(n):
+    if n < 1024:
+        return '%dB' % n
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if n < 1024 or unit == 'GB':
+            break
+        n /= 1024.0
+    return '%.1f%s' % (n, unit)
+
+class LRUCache(object):
+    ''' Least recently used cache, limited by the total size of its values in bytes.
+    Shared between the main thread and prefetch threads, so all access is locked.
+    '''
+
+    def __init__(self, budget, sizeof=nbytes):
+        self.budget = budget
+        self.sizeof = sizeof
+        self.items = OrderedDict()
+        self.sizes = {}
+        self.size = 0
+        self.lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.items
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key not in self.items:
+                self.misses += 1
+                return default
+
+            # move to most recently used
+            value = self.items.pop(key)
+            self.items[key] = value
+            self.hits += 1
+            return value
+
+    def peek(self, key, default=None):
+        ''' Look up a value without counting a hit or miss or changing its age '''
+        with self.lock:
+            return self.items.get(key, default)
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        with self.lock:
+            self.discard(key)
+            if size > self.budget:
+                return
+
+            self.items[key] = value
+            self.sizes[key] = size
+            self.size += size
+            self.evict()
+
+    def resize(self, key):
+        ''' Measure a cached value again after it has grown in place '''
+        with self.lock:
+            if key in self.items:
+                size = self.sizeof(self.items[key])
+                self.size += size - self.sizes[key]
+                self.sizes[key] = size
+                self.evict()
+
+    def discard(self, key):
+        with self.lock:
+            if key in self.items:
+                del self.items[key]
+                self.size -= self.sizes.pop(key)
+
+    def evict(self):
+        ''' Drop least recently used items until within budget '''
+        with self.lock:
+            while self.size > self.budget and len(self.items) > 0:
+                key = next(iter(self.items))
+                self.discard(key)
+                self.evictions += 1
+
+    def set_budget(self, budget):
+        self.budget = budget
+        self.evict()
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+            self.sizes.clear()
+            self.size = 0
+
+    def stats(self):
+        return '%s / %s  hits: %d  misses: %d  evicted: %d' % \
+            (format_bytes(self.size), format_bytes(self.budget), self.hits, self.misses, self.evictions)
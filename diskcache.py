@@ -0,0 +1,141 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import os
+import gzip
+import shutil
+import hashlib
+import tempfile
+import threading
+import itertools
+
+from prefetch import Prefetcher
+
+def gunzip(src, dst):
+    gzf = gzip.open(src, 'rb')
+    try:
+        with open(dst, 'wb') as f:
+            shutil.copyfileobj(gzf, f, 1024*1024)
+    finally:
+        gzf.close()
+
+def source_key(filename):
+    ''' Key for a source file, changes when the file is modified '''
+    st = os.stat(filename)
+    key = '%s:%d:%d' % (os.path.abspath(filename), int(st.st_mtime), st.st_size)
+    return hashlib.sha1(key).hexdigest()
+
+
+class DiskCache(object):
+    ''' Directory of files built from source files, such as decompressed .gz files.
+
+    Entries are named by the source's path, mtime and size, so they survive
+    between sessions and go stale when the source changes. Least recently
+    used entries are removed once the directory grows past max_size bytes.
+    '''
+
+    def __init__(self, path, build, max_size, suffix='', workers=2):
+        self.path = path
+        self.build = build
+        self.max_size = max_size
+        self.suffix = suffix
+        self.lock = threading.Lock()
+        self.wanted = {}
+        self.prefetcher = Prefetcher(self.get_path, workers=workers)
+
+    def cache_path(self, filename):
+        return os.path.join(self.path, source_key(filename) + self.suffix)
+
+    def get_path(self, filename):
+        cached = self.cache_path(filename)
+        if os.path.exists(cached):
+            os.utime(cached, None)  # mark as recently used
+            return cached
+
+        if not os.path.isdir(self.path):
+            try:
+                os.makedirs(self.path)
+            except OSError:
+                pass    # created by another thread
+
+        # build to a temp file first, so partially written files are never used
+        fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=self.path)
+        os.close(fd)
+        try:
+            self.build(filename, tmp)
+            os.rename(tmp, cached)
+        except:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+        self.evict(keep=cached)
+        return cached
+
+    def get(self, filename):
+        ''' Path to the cached file for filename, building it if needed '''
+        cached = self.prefetcher.get(filename)
+        if cached is not None and os.path.exists(cached):
+            return cached
+        return self.get_path(filename)
+
+    def prefetch(self, filenames, owner=None):
+        ''' Build entries for filenames on background threads. Each owner
+        (eg. a point cloud sequence) keeps its own list of wanted files '''
+        with self.lock:
+            self.wanted[owner] = filenames
+            # interleave, so the nearest files of every owner come first
+            keys = []
+            for group in itertools.izip_longest(*self.wanted.values()):
+                keys += [f for f in group if f is not None]
+        self.prefetcher.schedule(keys)
+
+    def evict(self, keep=None):
+        ''' Remove least recently used entries, other than keep, down to max_size '''
+        with self.lock:
+            entries = []
+            total = 0
+            for name in os.listdir(self.path):
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(self.path, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+
+            entries.sort()
+            for mtime, size, path in entries:
+                if total <= self.max_size:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
@@ -0,0 +1,147 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import os
+import json
+import atexit
+import hashlib
+import tempfile
+import threading
+
+# where indices go when the sequence's directory isn't writable
+fallback_dir = os.path.join(os.path.expanduser('~'), '.cache', 'pyglet-bits', 'index')
+
+def index_path(filepath):
+    ''' Sidecar file next to a sequence, eg. .name.####.pdb.index for name.####.pdb '''
+    dirname, basename = os.path.split(os.path.abspath(filepath))
+    if os.access(dirname, os.W_OK):
+        return os.path.join(dirname, '.%s.index' % basename)
+    return os.path.join(fallback_dir, hashlib.sha1(filepath).hexdigest() + '.index')
+
+
+class FrameIndex(object):
+    ''' Per frame metadata for a sequence, saved in a sidecar file and reused
+    between sessions.
+
+    Entries are dicts, as made by ptc.describe_frame: particle count,
+    attribute names/types, bbox and per attribute min/max/mean. Each is
+    stored with the frame file's mtime and size, and ignored once the file
+    changes.
+    '''
+
+    # save after this many new entries while building
+    save_every = 20
+
+    def __init__(self, filepath):
+        self.path = index_path(filepath)
+        self.frames = {}
+        self.lock = threading.Lock()
+        self.unsaved = 0
+        self.building = None
+
+        self.load()
+        atexit.register(self.save)
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                self.frames = json.load(f)
+        except (IOError, ValueError):
+            self.frames = {}
+
+    def save(self):
+        with self.lock:
+            if self.unsaved == 0:
+                return
+            data = json.dumps(self.frames)
+            self.unsaved = 0
+
+        dirname = os.path.dirname(self.path)
+        try:
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            fd, tmp = tempfile.mkstemp(dir=dirname)
+            with os.fdopen(fd, 'w') as f:
+                f.write(data)
+            os.rename(tmp, self.path)
+        except (IOError, OSError):
+            pass    # the index is only an optimisation
+
+    def get(self, filename):
+        ''' Metadata for a frame file, or None if it's not indexed or has changed '''
+        with self.lock:
+            info = self.frames.get(os.path.basename(filename))
+        if info is None:
+            return None
+
+        try:
+            st = os.stat(filename)
+        except OSError:
+            return None
+        if info['mtime'] != int(st.st_mtime) or info['size'] != st.st_size:
+            return None
+        return info
+
+    def add(self, filename, info):
+        st = os.stat(filename)
+        info = dict(info, mtime=int(st.st_mtime), size=st.st_size)
+        with self.lock:
+            self.frames[os.path.basename(filename)] = info
+            self.unsaved += 1
+
+    def update(self, filename, name, key, value):
+        ''' Store value under key in a dict field of an indexed frame's
+        entry, eg. its histograms. Returns False if the frame isn't indexed '''
+        info = self.get(filename)
+        if info is None:
+            return False
+        with self.lock:
+            info.setdefault(name, {})[key] = value
+            self.unsaved += 1
+        return True
+
+    def build(self, filenames, describe):
+        ''' Index frames that aren't already, on a background thread.
+        describe(filename) returns a frame's metadata '''
+        if self.building is not None and self.building.is_alive():
+            return
+
+        def run():
+            for filename in filenames:
+                if not os.path.exists(filename) or self.get(filename) is not None:
+                    continue
+                try:
+                    info = describe(filename)
+                except Exception:
+                    continue
+                if info is not None:
+                    self.add(filename, info)
+                if self.unsaved >= self.save_every:
+                    self.save()
+            self.save()
+
+        self.building = threading.Thread(target=run)
+        self.building.daemon = True
+        self.building.start()
@@ -0,0 +1,154 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import ctypes
+import numpy as np
+from pyglet.gl import *
+
+
+class StreamBuffer(object):
+    ''' Vertex buffer for data that's replaced often, such as a frame of an
+    animated point cloud.
+
+    Uploads go into a back buffer while the front buffer is drawn, and
+    the two are swapped once the upload is complete. Buffers are only
+    reallocated when the data outgrows them, otherwise the existing storage
+    is orphaned (so the driver needn't wait for draws still using it) and
+    refilled with glBufferSubData. Uploads can be split into chunks over
+    several calls to step(), so a large frame doesn't stall one redraw.
+
+    With nbuffers=1 and GL_STATIC_DRAW usage it also serves data that's
+    uploaded once, and target can be GL_ELEMENT_ARRAY_BUFFER for indices.
+    '''
+
+    # extra room allocated when growing, so slightly larger frames still fit
+    headroom = 1.125
+
+    def __init__(self, nbuffers=2, target=GL_ARRAY_BUFFER, usage=GL_STREAM_DRAW):
+        self.target = target
+        self.usage = usage
+        self.ids = [GLuint() for i in range(nbuffers)]
+        self.capacity = [0] * nbuffers
+        self.counts = [0] * nbuffers
+        self.dtypes = [None] * nbuffers
+        self.front = 0
+        self.back = 1 % nbuffers
+        self.pending = None     # array being uploaded to the back buffer
+        self.offset = 0         # bytes of it uploaded so far
+        self.uploaded = False   # back buffer holds newer data than the front
+        self.init()
+
+    def init(self):
+        for i in range(len(self.ids)):
+            glGenBuffers(1, ctypes.pointer(self.ids[i]))
+            self.capacity[i] = 0
+            self.counts[i] = 0
+        self.pending = None
+        self.uploaded = False
+
+    def delete(self):
+        for id in self.ids:
+            glDeleteBuffers(1, ctypes.pointer(id))
+        self.capacity = [0] * len(self.ids)
+        self.counts = [0] * len(self.ids)
+        self.pending = None
+        self.uploaded = False
+
+    def exists(self):
+        return glIsBuffer(self.ids[self.front])
+
+    @property
+    def id(self):
+        ''' Buffer to draw from '''
+        return self.ids[self.front]
+
+    @property
+    def count(self):
+        ''' Number of values in the buffer to draw from '''
+        return self.counts[self.front]
+
+    @property
+    def layout(self):
+        ''' numpy dtype of the buffer to draw from, eg. a structured dtype for interleaved data '''
+        return self.dtypes[self.front]
+
+    @property
+    def ready(self):
+        ''' True when there's nothing left to upload '''
+        return self.pending is None
+
+    def upload(self, array):
+        ''' Start uploading array to the back buffer, replacing any upload
+        still in progress. Call step() to upload it, and swap() to draw it '''
+        array = np.ascontiguousarray(array)
+        b = self.back
+
+        glBindBuffer(self.target, self.ids[b])
+        if array.nbytes > self.capacity[b]:
+            headroom = self.headroom if self.usage != GL_STATIC_DRAW else 1.0
+            self.capacity[b] = int(array.nbytes * headroom)
+            glBufferData(self.target, self.capacity[b], None, self.usage)
+        elif self.capacity[b] > 0:
+            # orphan the old storage rather than wait for it to be drawn
+            glBufferData(self.target, self.capacity[b], None, self.usage)
+
+        self.counts[b] = len(array)
+        self.dtypes[b] = array.dtype
+        self.pending = array
+        self.offset = 0
+        self.uploaded = True
+
+    def step(self, chunk=0):
+        ''' Upload up to chunk bytes of the pending array, or all of it
+        if chunk is 0. Returns True once the upload is complete '''
+        if self.pending is None:
+            return True
+
+        total = self.pending.nbytes
+        size = total - self.offset if chunk <= 0 else min(chunk, total - self.offset)
+        if size > 0:
+            glBindBuffer(self.target, self.ids[self.back])
+            glBufferSubData(self.target, self.offset, size, self.pending.ctypes.data + self.offset)
+            self.offset += size
+
+        if self.offset >= total:
+            self.pending = None
+            return True
+        return False
+
+    def swap(self):
+        ''' Draw from the newly uploaded buffer '''
+        if self.pending is not None or not self.uploaded:
+            return
+        self.front, self.back = self.back, self.front
+        self.uploaded = False
+
+    def read(self, dtype=np.float32):
+        ''' Contents of the front buffer, for checking uploads '''
+        array = np.empty(self.count, dtype=dtype)
+        glBindBuffer(self.target, self.id)
+        glGetBufferSubData(self.target, 0, array.nbytes, array.ctypes.data)
+        return array
+
@@ -0,0 +1,86 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import os
+from cache import LRUCache
+
+def entry_nbytes(entry):
+    ''' Rough memory used by a histogram entry of python lists '''
+    values = len(entry['lo']) + len(entry['hi']) + sum(len(c) for c in entry['counts'])
+    return 200 + values * 32
+
+def histogram_entry(stats):
+    ''' Histogram entry from stats.AttributeStats, as plain lists so it can be saved as json '''
+    return {'lo': stats.lo.tolist(),
+            'hi': stats.hi.tolist(),
+            'counts': stats.hist.tolist() }
+
+
+class HistogramCache(object):
+    ''' Attribute histograms of frame files, limited to budget bytes.
+
+    Entries are keyed by the file's path, mtime and size, the attribute name
+    and the number of bins, so they go stale when the file changes. If a
+    FrameIndex is given, entries are also saved in it, alongside the
+    sequence, and found there in later sessions.
+    '''
+
+    def __init__(self, budget):
+        self.cache = LRUCache(budget, sizeof=entry_nbytes)
+
+    @staticmethod
+    def key(filename, attr, bins):
+        st = os.stat(filename)
+        return (os.path.abspath(filename), int(st.st_mtime), st.st_size, attr, bins)
+
+    def get(self, filename, attr, bins, index=None):
+        try:
+            key = self.key(filename, attr, bins)
+        except OSError:
+            return None
+
+        entry = self.cache.get(key)
+        if entry is None and index is not None:
+            info = index.get(filename)
+            if info is not None:
+                entry = info.get('histograms', {}).get('%s:%d' % (attr, bins))
+            if entry is not None:
+                self.cache.put(key, entry)
+        return entry
+
+    def put(self, filename, attr, bins, entry, index=None):
+        try:
+            key = self.key(filename, attr, bins)
+        except OSError:
+            return
+        self.cache.put(key, entry)
+        if index is not None:
+            index.update(filename, 'histograms', '%s:%d' % (attr, bins), entry)
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self):
+        return self.cache.stats()
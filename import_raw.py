@@ -32,8 +32,15 @@ Notes:
 Generates the standard verts and faces lists, but without duplicate
 verts. Only *exact* duplicates are removed, there is no way to specify a
 tolerance.
+
+readMeshRAWArrays does the same with numpy, a chunk of lines at a time,
+returning arrays with quads split into triangles. compactMeshRAW can
+then weld vertices within a tolerance and drop degenerate triangles.
 """
 
+import itertools
+import numpy as np
+
 def readMeshRAW(filename):
     filehandle = open(filename, "rb")
 
@@ -81,3 +88,145 @@ def readMeshRAW(filename):
     return verts, faces_indices
 
 
+def countTokens(lines):
+    """ Number of whitespace separated values on each line """
+    text = ''.join(lines)
+    if not text.endswith('\n'):
+        text += '\n'
+    text = np.frombuffer(text, dtype=np.uint8)
+    space = text <= ord(' ')
+
+    # a value starts wherever a non space follows a space
+    starts = ~space
+    starts[1:] &= space[:-1]
+    ends = np.flatnonzero(text == ord('\n'))
+    return np.add.reduceat(starts, np.concatenate(([0], ends[:-1] + 1)),
+                           dtype=np.int32)
+
+
+def parseTrianglesRAW(lines):
+    """ Triangles in a list of raw lines, as an (n, 3, 3) float array.
+    Quads become two triangles, other lines are skipped. """
+    counts = countTokens(lines)
+    keep = (counts == 9) | (counts == 12)
+    if not keep.all():
+        lines = list(itertools.compress(lines, keep))
+        counts = counts[keep]
+
+    values = np.fromstring(''.join(lines), dtype=np.float64, sep=' ')
+    if len(values) != counts.sum():
+        # something that isn't a number, find the lines to skip one by one
+        def valid(line):
+            try:
+                map(float, line.split())
+                return True
+            except ValueError:
+                return False
+        return parseTrianglesRAW([line for line in lines if valid(line)])
+
+    starts = np.cumsum(counts) - counts
+    tris = values[starts[counts == 9].reshape(-1, 1) + np.arange(9)]
+    quads = values[starts[counts == 12].reshape(-1, 1) + np.arange(12)]
+    quads = quads.reshape(-1, 4, 3)
+    return np.concatenate((tris.reshape(-1, 3, 3),
+                           quads[:, [0, 1, 2]],
+                           quads[:, [0, 2, 3]]))
+
+
+def uniqueRows(verts):
+    """ Index of the first of each distinct row of an (n, 3) float64 array,
+    and the index of each row in those. Rows are sorted by a hash of their
+    bits, much faster than comparing them whole, and compared whole only
+    if hashes collide. """
+    verts = np.ascontiguousarray(verts + 0.0)  # -0.0 is the same vertex as 0.0
+    bits = verts.view(np.uint64)
+    h = bits[:, 0] * np.uint64(0x9E3779B97F4A7C15)
+    h ^= bits[:, 1] * np.uint64(0xC2B2AE3D27D4EB4F)
+    h ^= bits[:, 2] * np.uint64(0x165667B19E3779F9)
+
+    # np.unique(h, return_index=True) sorts with the much slower mergesort
+    order = np.argsort(h)
+    new = np.empty(len(h), dtype=bool)
+    new[0] = True
+    np.not_equal(h[order[1:]], h[order[:-1]], out=new[1:])
+    first = order[new]
+    inverse = np.empty(len(h), dtype=np.intp)
+    inverse[order] = np.cumsum(new) - 1
+
+    if not (bits[first][inverse] == bits).all():
+        rows = verts.view(np.dtype((np.void, 24))).ravel()
+        unique, first, inverse = np.unique(rows, return_index=True,
+                                           return_inverse=True)
+    return first, inverse
+
+
+def readMeshRAWArrays(filename, chunk_lines=1024 * 1024):
+    """ Vertices (n, 3) and triangle indices (m, 3) of a raw file, as arrays.
+
+    Lines are parsed in bulk, chunk_lines at a time, and duplicate
+    vertices removed from each chunk and then from all chunks together,
+    so memory use stays near the size of the result. """
+    chunk_verts = []
+    chunk_indices = []
+    offset = 0
+
+    with open(filename, "rb") as filehandle:
+        while True:
+            lines = list(itertools.islice(filehandle, chunk_lines))
+            if len(lines) == 0:
+                break
+            tris = parseTrianglesRAW(lines)
+            if len(tris) == 0:
+                continue
+            verts = tris.reshape(-1, 3)
+            first, inverse = uniqueRows(verts)
+            verts = verts[first]
+            chunk_verts.append(verts)
+            chunk_indices.append(inverse + offset)
+            offset += len(verts)
+
+    if len(chunk_verts) == 0:
+        return np.zeros((0, 3)), np.zeros((0, 3), dtype=np.int32)
+
+    verts = np.concatenate(chunk_verts)
+    first, inverse = uniqueRows(verts)
+    indices = inverse[np.concatenate(chunk_indices)]
+    return verts[first], indices.reshape(-1, 3).astype(np.int32)
+
+
+def weldVerticesRAW(verts, indices, epsilon):
+    """ Merge vertices that round to the same point on a grid of epsilon
+    spacing, such as copies that differ only by text round off. Each
+    merged vertex keeps the position of the first of them.
+
+    Copies either side of a grid line on some axis are missed, but they
+    round together on that axis with the grid offset by half a cell. So
+    it's repeated with each combination of offsets, and any vertices
+    within epsilon / 2 on each axis are welded. """
+    if epsilon <= 0 or len(verts) == 0:
+        return verts, indices
+    for offset in itertools.product((0.0, 0.5), repeat=3):
+        first, inverse = uniqueRows(np.round(verts / epsilon + offset))
+        verts, indices = verts[first], inverse[indices]
+    return verts, indices
+
+
+def compactMeshRAW(verts, indices, epsilon=0.0):
+    """ Weld vertices closer than about epsilon, drop triangles with no
+    area, then vertices no triangle uses. Indices are returned as uint16
+    if there are few enough vertices, otherwise uint32. """
+    verts, indices = weldVerticesRAW(verts, indices, epsilon)
+
+    # repeated corners, or in a straight line
+    i0, i1, i2 = indices[:, 0], indices[:, 1], indices[:, 2]
+    cross = np.cross(verts[i1] - verts[i0], verts[i2] - verts[i0])
+    keep = (i0 != i1) & (i1 != i2) & (i2 != i0) & (cross != 0).any(axis=1)
+    indices = indices[keep]
+
+    used = np.zeros(len(verts), dtype=bool)
+    used[indices] = True
+    remap = np.cumsum(used) - 1
+    verts = verts[used]
+
+    dtype = np.uint16 if len(verts) <= 65536 else np.uint32
+    return verts, remap[indices].astype(dtype)
@@ -59,49 +59,60 @@ def init():
     # load ptc objects from cmd line
     import ptc
     from ptc import Ptc
-    import re
+    from sequence import find_sequence, split_filename
 
-    # find first frame of sequences
-    maxframe = 0
-    minframe = 9999999999
+    # find frame range of sequences, from a listing of each sequence's directory
+    maxframe = None
+    minframe = None
+    filepaths = []
 
     for filename in sys.argv[1:]:
-        f_re = re.search('\.([0-9]+)\.', filename)
-        if f_re is None:
+        seq = find_sequence(filename)
+        if seq is None:
+            filepaths.append(filename)
             continue
-        f = int(f_re.group(1))
-        minframe = f
 
-        for i in xrange(f, f+10000):
-            #fi = filename_frame(filename, i)
-            fi = re.sub('(.+\.)[0-9]+(\..+)', '\g<1>%04d\g<2>'%i, filename)
-            
-            if ptc.valid_file(fi):
-                maxframe = i
-            else:
-                break
+        framestr = split_filename(filename)[2]
+        start = int(framestr) if framestr.isdigit() else None
+        start, end = seq.contiguous_range(start)
+        minframe = start if minframe is None else min(minframe, start)
+        maxframe = end if maxframe is None else max(maxframe, end)
 
-    scene.sframe.value = minframe
-    scene.eframe.value = maxframe
-    scene.frame.value =  minframe
+        gaps = [f for f in seq.gaps() if f > start]
+        if len(gaps) > 0:
+            print 'Missing frames in %s: %s' % (seq.pattern, ', '.join(str(f) for f in gaps[:10]))
+
+        filepaths.append(seq.pattern)
+
+    if minframe is not None:
+        scene.sframe.value = minframe
+        scene.eframe.value = maxframe
+        scene.frame.value =  minframe
 
 
     scene.pointclouds = []
-    for filename in sys.argv[1:]:
-        pointcloud = Ptc(scene, filename)
+    for filename, filepath in zip(sys.argv[1:], filepaths):
+        pointcloud = Ptc(scene, filepath)
         scene.pointclouds.append( pointcloud )
         layout = ui.layout.addLayout(bg=True)
         layout.addParameter(ui, pointcloud.visible, title=filename[-28:])
         
         layout.addParameter(ui, pointcloud.decimate)
         layout.addLabel(ui, param=pointcloud.num_particles)
+        layout.addLabel(ui, param=pointcloud.draw_stats)
         
         layout.addLabel(ui, title=' ') # Separator
 
         layout.addParameter(ui, pointcloud.attributes)
         layout.addParameter(ui, pointcloud.show_statistics)
         layout.addLabel(ui, param=pointcloud.attr_stats)
+        layout.addLabel(ui, param=pointcloud.selection_stats)
         layout.addParameter(ui, pointcloud.histogram)
+
+        layout.addControl(ui, func=pointcloud.calc_sequence_stats, title='Sequence Stats')
+        layout.addLabel(ui, param=pointcloud.sequence_stats)
+        layout.addParameter(ui, pointcloud.timeline)
+        layout.addParameter(ui, pointcloud.sequence_histogram)
         
         ui.layout.addLabel(ui, title=' ') # Separator
     
@@ -115,6 +126,12 @@ def init():
     layout.addParameter(ui, Ptc.gamma)
     layout.addParameter(ui, Ptc.exposure)
     layout.addParameter(ui, Ptc.hueoffset)
+    layout.addParameter(ui, Ptc.compact)
+    layout.addParameter(ui, Ptc.lod)
+    layout.addParameter(ui, Ptc.point_budget)
+    layout.addParameter(ui, Ptc.cull)
+    layout.addParameter(ui, Ptc.cache_size)
+    layout.addLabel(ui, param=Ptc.cache_stats)
     
     #scene.camera.fieldofview = Parameter(object=scene.camera, attr="fov", subtype=UiControls.ANGLE, update=scene.camera.update_projection, vmin=0.087, vmax=2.618)
     #layout.addParameter(ui, scene.camera.fieldofview)
@@ -0,0 +1,70 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+"""
+Binary files of processed mesh arrays, so imported meshes needn't be parsed
+and processed again on every run.
+
+A file is a line of json naming the arrays, followed by each array in
+.npy format, one after the other. Unlike .npz, every array can be memory
+mapped in place, so loading reads nothing until the data is used.
+"""
+
+import json
+import numpy as np
+
+# bump when the contents of cached meshes change, so old entries aren't used
+mesh_format = 3
+
+def save_mesh(path, **arrays):
+    names = sorted(arrays.keys())
+    with open(path, 'wb') as f:
+        f.write(json.dumps({'format': mesh_format, 'arrays': names}) + '\n')
+        for name in names:
+            np.lib.format.write_array(f, np.ascontiguousarray(arrays[name]))
+
+def load_mesh(path, mmap=True):
+    ''' Dict of the arrays in a mesh file, memory mapped read-only if mmap is True '''
+    arrays = {}
+    with open(path, 'rb') as f:
+        header = json.loads(f.readline())
+        if header.get('format') != mesh_format:
+            raise IOError('%s is not a mesh cache file of format %d' % (path, mesh_format))
+
+        for name in map(str, header['arrays']):
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            offset = f.tell()
+            nbytes = int(np.prod(shape)) * dtype.itemsize
+
+            if mmap and nbytes > 0:
+                arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape)
+            else:
+                arrays[name] = np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+            f.seek(offset + nbytes)
+    return arrays
@@ -0,0 +1,163 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+"""
+Triangle order optimisation for the GPU's post-transform vertex cache.
+
+Triangles sharing vertices are drawn close together (Tipsify, Sander et
+al. 2007), so vertices are more often still in the cache and needn't be
+shaded again. The quality is measured by ACMR, the average number of
+vertices shaded per triangle: 3 at worst, about 0.5 at best on a regular
+mesh. Meshes are done once, when they're cached, so plain python is
+fine here.
+"""
+
+import numpy as np
+
+# fifo cache size assumed, a conservative guess for most hardware
+cache_size = 16
+
+
+def acmr(indices, size=cache_size):
+    ''' Average cache miss ratio of drawing triangle indices (n,3) in order,
+    through a fifo vertex cache of size entries '''
+    indices = np.asarray(indices).reshape(-1)
+    if len(indices) == 0:
+        return 0.0
+
+    # a vertex is in the cache if fewer than size misses happened since it went in
+    stamp = [0] * (int(indices.max()) + 1)
+    misses = 0
+    for v in indices.tolist():
+        if misses - stamp[v] >= size or stamp[v] == 0:
+            misses += 1
+            stamp[v] = misses
+    return misses / (len(indices) / 3.0)
+
+
+def adjacency(indices, nverts):
+    ''' Triangles using each vertex, as offsets into a flat array of triangles '''
+    flat = indices.reshape(-1)
+    tris = np.argsort(flat, kind='mergesort') // 3
+    counts = np.bincount(flat, minlength=nverts)
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    return offsets, tris, counts
+
+
+def tipsify(indices, nverts, size=cache_size):
+    ''' Triangle indices (n,3) reordered for the vertex cache '''
+    indices = np.asarray(indices).reshape(-1, 3)
+    if len(indices) == 0:
+        return indices
+    offsets, tris, live = adjacency(indices, nverts)
+    offsets, tris, live = offsets.tolist(), tris.tolist(), live.tolist()
+    tri_verts = indices.tolist()
+
+    stamp = [0] * nverts      # time each vertex entered the cache
+    emitted = [False] * len(tri_verts)
+    dead_end = []
+    order = []
+    time = size + 1
+    cursor = 0                # next vertex to try when out of options
+
+    fan = 0
+    while fan >= 0:
+        # emit all triangles around the fanning vertex
+        candidates = []
+        for t in tris[offsets[fan]:offsets[fan+1]]:
+            if emitted[t]:
+                continue
+            emitted[t] = True
+            order.append(t)
+            for v in tri_verts[t]:
+                dead_end.append(v)
+                candidates.append(v)
+                live[v] -= 1
+                if time - stamp[v] > size:
+                    stamp[v] = time
+                    time += 1
+
+        # next fan around the candidate that will still be in the cache
+        # once its remaining triangles are drawn, and has been there longest
+        fan = -1
+        best = -1
+        for v in candidates:
+            if live[v] > 0:
+                priority = 0
+                if time - stamp[v] + 2 * live[v] <= size:
+                    priority = time - stamp[v]
+                if priority > best:
+                    best = priority
+                    fan = v
+
+        # otherwise a recently used vertex, or the next unfinished one
+        while fan < 0 and dead_end:
+            v = dead_end.pop()
+            if live[v] > 0:
+                fan = v
+        while fan < 0 and cursor < nverts:
+            if live[cursor] > 0:
+                fan = cursor
+            cursor += 1
+
+    return indices[order]
+
+
+def reorder_vertices(indices, nverts):
+    ''' Vertex order of first use by triangle indices, for locality when
+    fetching vertices, and the indices renumbered to it. Unused vertices
+    go last. Use as verts[order], new_indices '''
+    flat = np.asarray(indices).reshape(-1)
+    used, first_use = np.unique(flat, return_index=True)
+    first = np.full(nverts, len(flat), dtype=np.int64)
+    first[used] = first_use
+    order = np.argsort(first, kind='mergesort')
+    remap = np.empty(nverts, dtype=flat.dtype)
+    remap[order] = np.arange(nverts)
+    return order, remap[indices]
+
+
+def optimize(indices, nverts, size=cache_size):
+    ''' Reorder triangles for the vertex cache, then vertices for fetching.
+    Returns the vertex order, new indices and the ACMR before and after '''
+    before = acmr(indices, size)
+    indices = tipsify(indices, nverts, size)
+    order, indices = reorder_vertices(indices, nverts)
+    return order, indices, before, acmr(indices, size)
+
+
+if __name__ == '__main__':
+    # report on a raw mesh, eg. python meshopt.py trim.raw
+    import sys
+    import time
+    import import_raw
+
+    for filename in sys.argv[1:] or ['trim.raw']:
+        verts, indices = import_raw.readMeshRAWArrays(filename)
+        verts, indices = import_raw.compactMeshRAW(verts, indices)
+        t = time.time()
+        order, optimized, before, after = optimize(indices, len(verts))
+        print '%s: %d triangles, ACMR %.3f -> %.3f (%.2fs)' % \
+            (filename, len(indices), before, after, time.time() - t)
@@ -31,15 +31,27 @@ from pyglet.window import mouse, key
 from pyglet.gl import *
 from shader import Shader
 import math
+import re
+import os
 from ui3d import Grid, Axes
 from parameter import Parameter, Color3
 from keys import keys
+from glbuffer import StreamBuffer
+from diskcache import DiskCache
+import meshcache
+import meshopt
 
 glsl_util = ''.join(open('util.glsl').readlines())
 
 def filename_frame(filename, frame):
-    return filename.replace('####', '%04d' % frame)
+    # a run of #s is replaced by the frame number, padded to the same width
+    return re.sub('#+', lambda m: '%0*d' % (len(m.group(0)), frame), filename)
     
+def normalize(v):
+    ''' Rows of an (n,3) array scaled to unit length, zero length rows stay zero '''
+    length = np.sqrt((v**2).sum(1)).reshape(-1,1)
+    return v / np.where(length > 0, length, 1)
+
 class Scene(object):
     
     PAUSED = 0
@@ -58,6 +70,7 @@ class Scene(object):
 
     def __init__(self):
         self.objects = []
+        self.overlays = []  # drawn in window coordinates over the scene, with draw_overlay()
         self.camera = None
         
         self.playback = Parameter(default=self.PAUSED, enum=[('Play',self.PLAYING),('Pause',self.PAUSED)])
@@ -84,8 +97,9 @@ class Scene(object):
         for ob in self.objects:
             if hasattr(ob, "bbmin") and hasattr(ob, "bbmax"):
                 if self.bbmin is None and self.bbmax is None:
-                    self.bbmin = ob.bbmin
-                    self.bbmax = ob.bbmax
+                    # copy, objects' bounds may be shared with cached frames
+                    self.bbmin = ob.bbmin.copy()
+                    self.bbmax = ob.bbmax.copy()
                 else:
                     self.bbmin.x = min(ob.bbmin.x, self.bbmin.x)
                     self.bbmin.y = min(ob.bbmin.y, self.bbmin.y)
@@ -140,6 +154,9 @@ class Scene(object):
         self.ui3d_batch.draw()
         self.ui3d_shader.unbind()
 
+        for overlay in self.overlays:
+            overlay.draw_overlay()
+
         glDisable(GL_LINE_SMOOTH)
 
     def update_time(self):            
@@ -190,7 +207,8 @@ class Object3d(object):
         # stupid rotate_euler taking coords out of order!
         return Matrix4.new_translate(*self.translate.value).rotate_euler(*self.rotate.value.yzx).scale(*self.scale.value)
 
-    def transform_verts(self, verts, matrix):
+    @staticmethod
+    def transform_verts(verts, matrix):
         ''' Transform a numpy array of vertex positions by a matrix '''
         # rotate 90 degrees to Y up, from blender
         mat = np.matrix( matrix[:] ).reshape(4,4)
@@ -198,33 +216,36 @@ class Object3d(object):
         verts = np.insert(verts, 3, 1.0, axis=1)
         # multiply and transpose back to array of vec3
         verts = np.dot(mat.T, verts.T)[:-1].T
-        return verts
-
-    def calculate_normals(self, verts, idx):
-        v1 = verts[idx[::3]]
-        v1_indices = idx[:,0]
-        v2_indices = idx[:,1]
-        v3_indices = idx[:,2]
-
-        # take first 2 edges of each tri
-        edge1 = verts[v1_indices] - verts[v2_indices]
-        edge2 = verts[v1_indices] - verts[v3_indices]
-
-        # generate normal for each face
-        fnrm = np.cross(edge1, edge2)
-        # normalise
-        fnrm /= ( np.sqrt( fnrm[:,0]**2 + fnrm[:,1]**2 + fnrm[:,2]**2 ).reshape(-1,1) )
-
-        # crazy generator exp to make smooth normals by
-        # summing normals of faces adjacent to each vertex
-        #print([np.sum(fnrm[j] for j, fi in enumerate(idx) if i in fi) for i in range(len(verts))])
-        vn = np.vstack([ np.sum(fnrm[j] for j, fi in enumerate(idx) if i in fi) for i in range(len(verts)) ])
-
-        #print(vn)
-        # normalise vertex normals
-        vn /= ( np.sqrt( vn[:,0]**2 + vn[:,1]**2 + vn[:,2]**2 ).reshape(-1,1) )
-
-        return vn
+        return np.asarray(verts)
+
+    @staticmethod
+    def calculate_normals(verts, idx, weighting=None):
+        ''' Smooth vertex normals, summing the normals of the faces around each vertex.
+        weighting is None to count each face equally, 'area' to weight faces
+        by their area, or 'angle' by the angle of their corner at the vertex '''
+        verts = np.asarray(verts)
+        idx = np.asarray(idx).reshape(-1,3)
+        corners = [ verts[idx[:,i]] for i in range(3) ]
+
+        # cross product of first 2 edges of each tri, its length is twice the area
+        fnrm = np.cross(corners[0] - corners[1], corners[0] - corners[2])
+        if weighting != 'area':
+            fnrm = normalize(fnrm)
+
+        # scatter add each face's normal to its 3 vertices
+        vn = np.zeros((len(verts), 3))
+        for i in range(3):
+            if weighting == 'angle':
+                a = corners[(i+1)%3] - corners[i]
+                b = corners[(i+2)%3] - corners[i]
+                angle = np.arctan2(np.sqrt((np.cross(a, b)**2).sum(1)), (a*b).sum(1))
+                weighted = fnrm * angle.reshape(-1,1)
+            else:
+                weighted = fnrm
+            for c in range(3):
+                vn[:,c] += np.bincount(idx[:,i], weights=weighted[:,c], minlength=len(verts))
+
+        return normalize(vn)
 
     def __init__(self, scene):
         self.batch = pyglet.graphics.Batch()
@@ -292,30 +313,45 @@ class Raw(Object3d):
     
     '''
     
+    # vertices nearer than this are welded in cached meshes,
+    # bump meshcache.mesh_format after changing it
+    weld_epsilon = 1e-5
+
     def __init__(self, *args, **kwargs):
+        self.filename = kwargs.pop('filename', 'trim.raw')
         super(Raw, self).__init__(*args, **kwargs)
 
-        import import_raw
-        self.vertices, self.indices = import_raw.readMeshRAW('trim.raw')
-        
-        verts = np.array(self.vertices).reshape(-1,3)
-        idx = np.array(self.indices).reshape(-1,3)
+        # deduplicated, Y up verts with normals, from the mesh cache
+        mesh = meshcache.load_mesh(mesh_cache.get(self.filename))
+        self.vbo_verts = StreamBuffer(1, usage=GL_STATIC_DRAW)
+        self.vbo_normals = StreamBuffer(1, usage=GL_STATIC_DRAW)
+        self.vbo_indices = StreamBuffer(1, target=GL_ELEMENT_ARRAY_BUFFER, usage=GL_STATIC_DRAW)
+        for vbo, name in ((self.vbo_verts, 'vertices'), (self.vbo_normals, 'normals'), (self.vbo_indices, 'indices')):
+            vbo.upload(mesh[name].reshape(-1))
+            vbo.step()
+            vbo.swap()
 
-        verts = self.transform_verts(verts, Matrix4.new_rotate_axis(math.pi*-0.5, Vector3(1,0,0)) )
-        vn = self.calculate_normals(verts, idx)
-        
-        self.vertices = tuple(verts.flat)
-        self.normals = tuple(vn.flat)
-        self.indices = tuple(idx.flat)
-        self.vertex_list = self.batch.add_indexed(len(self.vertices)//3,
-                                             GL_TRIANGLES,
-                                             None,
-                                             self.indices,
-                                             ('v3f/static', self.vertices),
-                                             ('n3f/static', self.normals)
-                                             )
         self.color = Parameter(default=Color3(0.9, 0.3, 0.4), vmin=0.0, vmax=1.0)
 
+    @staticmethod
+    def build_mesh(filename, path):
+        ''' Mesh cache entry for a raw file '''
+        import import_raw
+        verts, idx = import_raw.readMeshRAWArrays(filename)
+        verts, idx = import_raw.compactMeshRAW(verts, idx, Raw.weld_epsilon)
+
+        # triangle order for the vertex cache, then vertices in order of use
+        # (python meshopt.py reports how much it helps)
+        order, idx = meshopt.optimize(idx, len(verts))[:2]
+        verts = verts[order]
+
+        verts = Object3d.transform_verts(verts, Matrix4.new_rotate_axis(math.pi*-0.5, Vector3(1,0,0)) )
+        vn = Object3d.calculate_normals(verts, idx)
+
+        meshcache.save_mesh(path, vertices=np.asarray(verts, dtype=np.float32),
+                                  normals=vn.astype(np.float32),
+                                  indices=idx)
+
     def draw(self, time=0, camera=None):
         m = self.matrix()
 
@@ -324,10 +360,34 @@ class Raw(Object3d):
         self.shader.uniformf('color', *self.color.value)
         self.shader.uniform_matrixf('modelview', camera.matrixinv * m)
         self.shader.uniform_matrixf('projection', camera.persp_matrix)
-        
-        self.batch.draw()
+
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo_verts.id)
+        glVertexPointer(3, GL_FLOAT, 0, 0)
+        glEnableClientState(GL_NORMAL_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo_normals.id)
+        glNormalPointer(GL_FLOAT, 0, 0)
+
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.vbo_indices.id)
+        gltype = GL_UNSIGNED_SHORT if self.vbo_indices.layout == np.uint16 else GL_UNSIGNED_INT
+        glDrawElements(GL_TRIANGLES, self.vbo_indices.count, gltype, 0)
+
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glDisableClientState(GL_NORMAL_ARRAY)
         self.shader.unbind()
 
+    def delete(self):
+        self.vbo_verts.delete()
+        self.vbo_normals.delete()
+        self.vbo_indices.delete()
+
+# processed raw meshes, kept between sessions
+mesh_cache_dir = os.path.join(os.path.expanduser('~'), '.cache', 'pyglet-bits', 'mesh')
+mesh_cache = DiskCache(mesh_cache_dir, Raw.build_mesh, 1024**3,
+                       suffix='.mesh%d' % meshcache.mesh_format, workers=1)
+
 class Cube(Object3d):
     
     vertex_shader = '''
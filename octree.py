@@ -0,0 +1,163 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import numpy as np
+
+def matrix_array(m):
+    ''' euclid Matrix4 as a row major numpy array '''
+    return np.array(m[:], dtype=np.float64).reshape(4,4).T
+
+def morton_codes(ijk, depth):
+    ''' Interleave the bits of integer cell coordinates, so cells of the same
+    octree node have neighbouring codes '''
+    codes = np.zeros(len(ijk), dtype=np.int64)
+    for b in range(depth):
+        for axis in range(3):
+            codes |= ((ijk[:,axis] >> b) & 1) << (3*b + axis)
+    return codes
+
+
+class Octree(object):
+    ''' Particles of a frame grouped into the leaves of an octree.
+
+    order sorts the particles by leaf, in morton order so each octree node's
+    particles are contiguous, and randomly within each leaf, so the first
+    particles of a leaf are an even sample of it. Drawing a prefix of every
+    leaf gives a level of detail that can vary across the cloud.
+    '''
+
+    def __init__(self, verts, bbmin, bbmax, leaf_size=4096, max_depth=10):
+        v = verts.reshape(-1,3)
+        n = len(v)
+
+        depth = 0
+        while depth < max_depth and n > leaf_size * 8**depth:
+            depth += 1
+        self.depth = depth
+
+        cells = 1 << depth
+        lo = np.array(bbmin[:], dtype=np.float32)
+        size = np.array(bbmax[:], dtype=np.float32) - lo
+        size[size == 0] = 1
+        ijk = ((v - lo) * (cells / size)).astype(np.int64)
+        np.clip(ijk, 0, cells-1, out=ijk)
+        codes = morton_codes(ijk, depth)
+        del ijk
+
+        # stable sort of shuffled particles, leaving them in random order within leaves
+        shuffle = np.random.RandomState(n).permutation(n)
+        self.order = shuffle[ np.argsort(codes[shuffle], kind='mergesort') ].astype(np.int32)
+        codes = codes[self.order]
+
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if n > 0 else np.empty(0, np.int64)
+        self.codes = codes[starts]
+        self.first = starts.astype(np.int32)
+        self.count = np.diff(np.r_[starts, n]).astype(np.int32)
+
+        # tight bounds of each leaf
+        if n > 0:
+            sorted_verts = v[self.order]
+            self.bbmin = np.minimum.reduceat(sorted_verts, starts, axis=0)
+            self.bbmax = np.maximum.reduceat(sorted_verts, starts, axis=0)
+        else:
+            self.bbmin = self.bbmax = np.empty((0,3), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.first)
+
+    @property
+    def nbytes(self):
+        return self.order.nbytes + self.codes.nbytes + self.first.nbytes + self.count.nbytes \
+            + self.bbmin.nbytes + self.bbmax.nbytes
+
+    def visible(self, projection, modelview):
+        ''' Mask of the leaves whose bounds intersect the view frustum '''
+        m = np.dot(matrix_array(projection), matrix_array(modelview))
+
+        # frustum planes from the rows of the clip matrix, normals pointing inwards
+        planes = np.array([m[3] + m[0], m[3] - m[0],
+                           m[3] + m[1], m[3] - m[1],
+                           m[3] + m[2], m[3] - m[2]])
+        normals, offsets = planes[:,:3], planes[:,3]
+
+        # a leaf is outside if the corner furthest along a plane's normal is behind it
+        visible = np.ones(len(self), dtype=bool)
+        for n, d in zip(normals, offsets):
+            corner = np.where(n >= 0, self.bbmax, self.bbmin)
+            visible &= np.dot(corner, n) + d >= 0
+        return visible
+
+    def cone_leaves(self, origin, direction, angle):
+        ''' Leaves whose bounds may contain points within angle (radians) of
+        a ray, nearest first, with the nearest possible distance of each.
+        direction must be normalised '''
+        centers = (self.bbmin + self.bbmax) * 0.5 - origin
+        radius = 0.5 * np.sqrt(((self.bbmax - self.bbmin)**2).sum(1))
+        dist = np.sqrt((centers**2).sum(1))
+
+        # angle to the leaf's bounding sphere, less the angle the sphere covers
+        safe = np.maximum(dist, 1e-12)
+        to_center = np.arccos(np.clip(np.dot(centers, direction) / safe, -1, 1))
+        spread = np.arcsin(np.clip(radius / safe, 0, 1))
+        hit = np.flatnonzero((dist <= radius) | (to_center - spread <= angle))
+
+        near = np.maximum(dist[hit] - radius[hit], 0)
+        nearest = np.argsort(near)
+        return hit[nearest], near[nearest]
+
+    def projected_size(self, modelview, focal, height):
+        ''' Approximate diameter in pixels of each leaf on screen. focal is
+        the perspective matrix's y scale, height the viewport height '''
+        mv = matrix_array(modelview)
+        centers = (self.bbmin + self.bbmax) * 0.5
+        radius = 0.5 * np.sqrt(((self.bbmax - self.bbmin)**2).sum(1))
+
+        # distance in front of the camera, leaves around it are as large as they can be
+        z = -(np.dot(centers, mv[2,:3]) + mv[2,3])
+        dist = np.maximum(z, radius)
+        dist[dist <= 0] = 1e-6
+        return 2 * radius * focal * 0.5 * height / dist
+
+    def lod_counts(self, modelview, focal, height, budget, visible=None):
+        ''' Number of particles to draw from each leaf, proportional to the
+        leaf's projected area, limited to budget particles in total. Leaves
+        not in the visible mask get none '''
+        count = self.count if visible is None else np.where(visible, self.count, 0)
+        if count.sum() <= budget:
+            return count.astype(np.int32)
+
+        area = self.projected_size(modelview, focal, height) ** 2
+        area = np.maximum(area, 1e-6)
+
+        # find the scale of area -> particles that spends the budget,
+        # leaves covering more of the screen get more of their particles
+        lo, hi = 0.0, float(count.max()) / area.min()
+        for i in range(60):
+            k = (lo + hi) * 0.5
+            if np.minimum(count, k * area).sum() > budget:
+                hi = k
+            else:
+                lo = k
+        return np.minimum(count, np.ceil(lo * area)).astype(np.int32)
@@ -0,0 +1,226 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+"""
+Reader for Maya particle database (.pdb) files, as written by partio.
+
+Mirrors the parts of the partio python api used by ptc.py (numParticles,
+numAttributes, attributeInfo, getArray), but copies each attribute in
+bulk into a contiguous numpy array instead of one particle at a time.
+Uncompressed files can also be memory mapped, in which case getArray
+returns read-only views of the file's data without copying.
+
+The file is a header, followed by one block per attribute (channel):
+channel headers, a null terminated name, then the values for all
+particles. Pointer fields in the headers are 32 or 64 bit depending on
+the flavour of the file (.pdb/.pdb32 or .pdb64).
+"""
+
+import os
+import gzip
+import zlib
+import struct
+import numpy as np
+
+PDB_MAGIC = 670
+
+# attribute types, matching partio's ParticleAttributeType
+NONE = 0
+VECTOR = 1
+FLOAT = 2
+INT = 3
+
+# pdb channel type -> (attribute type, count, numpy type)
+channel_types = {
+    1: (VECTOR, 3, 'f4'),     # PDB_VECTOR
+    2: (FLOAT, 1, 'f4'),      # PDB_REAL
+    3: (INT, 1, 'i4'),        # PDB_LONG
+}
+
+# struct layouts, including padding, for 32 and 64 bit pointers
+header_struct = {
+    32: 'iH2xf4xdII32s4x4x',
+    64: 'iH2xf4xdII32s8x',
+}
+channel_io_struct = 'cxHcc'
+channel_struct = {
+    32: '4xiIIIcc2x4x4x4x',
+    64: '8xiIIIcc6x8x8x8x',
+}
+channel_data_struct = {
+    32: 'iIIi4x',
+    64: 'iIIi8x',
+}
+
+read_chunk = 4*1024*1024
+
+
+class PdbError(Exception):
+    pass
+
+
+def is_pdb(filename):
+    if filename.endswith('.gz'):
+        filename = filename[:-3]
+    return os.path.splitext(filename)[1] in ('.pdb', '.pdb32', '.pdb64')
+
+def pointer_bits(filename):
+    if filename.endswith('.gz'):
+        filename = filename[:-3]
+    return 64 if filename.endswith('.pdb64') else 32
+
+def open_file(filename):
+    if filename.endswith('.gz'):
+        return gzip.open(filename, 'rb')
+    return open(filename, 'rb')
+
+def read_struct(f, fmt):
+    size = struct.calcsize(fmt)
+    data = f.read(size)
+    if len(data) != size:
+        raise PdbError('Unexpected end of file')
+    return struct.unpack(fmt, data)
+
+def read_name(f):
+    name = []
+    while True:
+        c = f.read(1)
+        if c == '':
+            raise PdbError('Unexpected end of file')
+        if c == '\0':
+            return ''.join(name)
+        name.append(c)
+
+def read_into(f, array):
+    ''' Fill a preallocated array from a file object, without per element python work '''
+    buf = array.view(np.uint8)
+    if hasattr(f, 'readinto') and not isinstance(f, gzip.GzipFile):
+        if f.readinto(buf) != len(buf):
+            raise PdbError('Unexpected end of file')
+        return
+
+    pos = 0
+    while pos < len(buf):
+        data = f.read(min(read_chunk, len(buf) - pos))
+        if len(data) == 0:
+            raise PdbError('Unexpected end of file')
+        buf[pos:pos+len(data)] = np.frombuffer(data, dtype=np.uint8)
+        pos += len(data)
+
+
+class PdbAttribute(object):
+    ''' Attribute info, like partio's ParticleAttribute '''
+    def __init__(self, name, type, count, dtype, offset):
+        self.name = name
+        self.type = type
+        self.count = count
+        self.dtype = dtype
+        self.offset = offset    # of the attribute's values in the (uncompressed) file
+
+
+class PdbFile(object):
+
+    def __init__(self, filename, mmap=False):
+        self.filename = filename
+        self.bits = pointer_bits(filename)
+        self.attributes = []
+        self.mmap = mmap and not filename.endswith('.gz')
+
+        with open_file(filename) as f:
+            try:
+                self.read_header(f)
+            except (IOError, EOFError, struct.error, zlib.error):
+                # a damaged gzip stream
+                raise PdbError('%s is not a valid pdb file' % self.filename)
+
+    def read_header(self, f):
+        fmt = header_struct[self.bits]
+        data = f.read(struct.calcsize('<' + fmt))
+        if len(data) != struct.calcsize('<' + fmt):
+            raise PdbError('%s is not a pdb file' % self.filename)
+
+        # files written on big endian machines have the magic number swapped
+        for bo in ('<', '>'):
+            magic, swap, version, time, numparts, numattrs, padding = struct.unpack(bo + fmt, data)
+            if magic == PDB_MAGIC:
+                break
+        else:
+            raise PdbError('%s is not a pdb file' % self.filename)
+
+        self.byteorder = bo
+        self.time = time
+        self.numparts = numparts
+
+        # compressed files can't be measured, but can't seek past their end either
+        size = os.fstat(f.fileno()).st_size if not isinstance(f, gzip.GzipFile) else None
+
+        for i in range(numattrs):
+            read_struct(f, bo + channel_io_struct)
+            ctype = read_struct(f, bo + channel_struct[self.bits])[0]
+            name = read_name(f)
+            datasize = read_struct(f, bo + channel_data_struct[self.bits])[1]
+
+            offset = f.tell()
+            if ctype in channel_types.keys():
+                atype, count, nptype = channel_types[ctype]
+                datasize = count * 4
+                self.attributes.append( PdbAttribute(name, atype, count, np.dtype(bo + nptype), offset) )
+
+            # skip over the values to the next channel. a file still being written
+            # is rejected here, rather than when its attributes are read
+            end = offset + datasize * numparts
+            f.seek(end)
+            if f.tell() != end or (size is not None and end > size):
+                raise PdbError('%s is truncated' % self.filename)
+
+    # partio style api
+    def numParticles(self):
+        return self.numparts
+
+    def numAttributes(self):
+        return len(self.attributes)
+
+    def attributeInfo(self, i):
+        return self.attributes[i]
+
+    def getArray(self, attr):
+        ''' Read all values of an attribute into a flat, native byte order array '''
+        size = self.numparts * attr.count
+        if size == 0:
+            return np.empty(0, dtype=attr.dtype.newbyteorder('='))
+
+        if self.mmap and attr.dtype.isnative:
+            if attr.offset + size * attr.dtype.itemsize > os.path.getsize(self.filename):
+                raise PdbError('Unexpected end of file')
+            return np.memmap(self.filename, dtype=attr.dtype, mode='r', offset=attr.offset, shape=(size,))
+
+        array = np.empty(size, dtype=attr.dtype)
+        with open_file(self.filename) as f:
+            f.seek(attr.offset)
+            read_into(f, array)
+
+        if attr.dtype.byteorder == '>':
+            array = array.byteswap(True).view(attr.dtype.newbyteorder('='))
+        return array
@@ -0,0 +1,138 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import numpy as np
+
+
+class ConePicker(object):
+    ''' Finds the point nearest a ray's origin, of those within an angle of
+    the ray.
+
+    Points are processed in chunks through scratch buffers that are kept
+    between calls, so a pick allocates nothing the size of the cloud.
+    Distances are compared squared, and the angle test is done without
+    normalising: v.d > |v| cos(angle)  <=>  v.d > 0 and (v.d)^2 > |v|^2 cos^2(angle)
+    '''
+
+    def __init__(self, chunk=65536):
+        self.chunk = chunk
+        self.v = np.empty((chunk, 3), dtype=np.float32)
+        self.dot = np.empty(chunk, dtype=np.float32)
+        self.length2 = np.empty(chunk, dtype=np.float32)
+        self.tmp = np.empty(chunk, dtype=np.float32)
+        self.limit = np.empty(chunk, dtype=np.float32)
+        self.mask = np.empty(chunk, dtype=bool)
+        self.mask2 = np.empty(chunk, dtype=bool)
+
+    def nearest(self, verts, origin, direction, cos_angle, idx=None):
+        ''' Index into verts (n,3) of the nearest point to origin within the
+        cone, and its distance, or (None, inf). If idx is given, only those
+        points are searched. direction must be normalised '''
+        origin = np.asarray(origin, dtype=np.float32)
+        direction = np.asarray(direction, dtype=np.float32)
+        cos2 = np.float32(cos_angle * cos_angle)
+        n = len(idx) if idx is not None else len(verts)
+
+        best = None
+        best_dist2 = np.inf
+        for start in xrange(0, n, self.chunk):
+            size = min(self.chunk, n - start)
+            v, dot, length2 = self.v[:size], self.dot[:size], self.length2[:size]
+            tmp, limit = self.tmp[:size], self.limit[:size]
+            mask, mask2 = self.mask[:size], self.mask2[:size]
+
+            # vector ray origin to point
+            if idx is not None:
+                np.take(verts, idx[start:start+size], axis=0, out=v)
+            else:
+                v[:] = verts[start:start+size]
+            v -= origin
+
+            np.dot(v, direction, out=dot)
+            np.einsum('ij,ij->i', v, v, out=length2)
+
+            # within angle
+            np.multiply(dot, dot, out=tmp)
+            np.multiply(length2, cos2, out=limit)
+            np.greater(tmp, limit, out=mask)
+            np.greater(dot, 0, out=mask2)
+            mask &= mask2
+
+            # nearest of those
+            tmp.fill(np.inf)
+            np.copyto(tmp, length2, where=mask)
+            i = tmp.argmin()
+            if tmp[i] < best_dist2:
+                best_dist2 = tmp[i]
+                best = start + i if idx is None else idx[start + i]
+
+        return best, np.sqrt(best_dist2)
+
+
+def intersect_reference(verts, p, raydir, dot_thresh):
+    ''' The original Ptc.intersect search over every point, for comparison '''
+    verts = verts.reshape(-1,3)
+    rayp = np.array(p).reshape(-1,3).repeat(len(verts), axis=0)
+    v = verts - rayp
+    v_length = np.sqrt((v ** 2).sum(1)).reshape(-1,1)
+    v /= v_length
+    d = (v * np.array(raydir)).sum(1)
+    condition = (d > dot_thresh).reshape(-1,1)
+    verts_within_angle = verts[condition.repeat(3, axis=1)].reshape(-1,3)
+    v_len_within_angle = v_length[condition]
+    if len(verts_within_angle) == 0:
+        return None
+    sort_order = v_len_within_angle.argsort()
+    return verts_within_angle[sort_order][0]
+
+
+if __name__ == '__main__':
+    # benchmark against the original implementation, eg. python pick.py 1000000 10000000
+    import sys
+    import math
+    import time
+
+    counts = [int(a) for a in sys.argv[1:]] or [1000000, 10000000]
+    dot_thresh = math.cos(math.radians(1))
+    picker = ConePicker()
+    rng = np.random.RandomState(0)
+
+    for n in counts:
+        verts = rng.rand(n, 3).astype(np.float32) * 10
+        origin = np.array([5.0, 5.0, 30.0])
+        direction = np.array([0.02, -0.01, -1.0])
+        direction /= np.sqrt((direction**2).sum())
+
+        t = time.time()
+        expected = intersect_reference(verts, origin, direction, dot_thresh)
+        reference_time = time.time() - t
+
+        t = time.time()
+        i, dist = picker.nearest(verts, origin, direction, dot_thresh)
+        kernel_time = time.time() - t
+
+        assert np.allclose(verts[i], expected)
+        print '%d points: reference %.3fs, kernel %.3fs (%.1fx)' % \
+            (n, reference_time, kernel_time, reference_time / kernel_time)
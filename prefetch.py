@@ -0,0 +1,114 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import threading
+from collections import deque
+
+
+def frame_window(frame, step, ahead, sframe, eframe, loop=False):
+    ''' Frames likely to be requested after frame, moving by step per update '''
+    frames = []
+    length = eframe - sframe + 1
+    for i in range(1, ahead+1):
+        f = frame + step*i
+        if loop and length > 0:
+            f = sframe + (f - sframe) % length
+        elif f < sframe or f > eframe:
+            break
+        if f != frame and f not in frames:
+            frames.append(f)
+    return frames
+
+
+class Prefetcher(object):
+    ''' Load upcoming frames on background threads.
+
+    loader(key) is called from worker threads and should return the
+    loaded data, ready to be handed to the main thread.  Keys are
+    processed nearest first, and rescheduling drops queued keys that
+    are no longer wanted.
+    '''
+
+    def __init__(self, loader, workers=2):
+        self.loader = loader
+        self.cond = threading.Condition()
+        self.queue = deque()
+        self.loading = set()
+        self.results = {}
+        self.wanted = set()
+
+        for i in range(workers):
+            t = threading.Thread(target=self.worker)
+            t.daemon = True
+            t.start()
+
+    def worker(self):
+        while True:
+            with self.cond:
+                while len(self.queue) == 0:
+                    self.cond.wait()
+                key = self.queue.popleft()
+                self.loading.add(key)
+
+            try:
+                data = self.loader(key)
+            except Exception:
+                # leave it to the main thread to load and report the error
+                data = None
+
+            with self.cond:
+                self.loading.discard(key)
+                if key in self.wanted:
+                    self.results[key] = data
+                self.cond.notify_all()
+
+    def schedule(self, keys):
+        ''' Replace the set of wanted keys, in order of priority '''
+        with self.cond:
+            self.wanted = set(keys)
+            for key in self.results.keys():
+                if key not in self.wanted:
+                    del self.results[key]
+
+            self.queue.clear()
+            for key in keys:
+                if key not in self.results and key not in self.loading:
+                    self.queue.append(key)
+            self.cond.notify_all()
+
+    def ready(self, key):
+        ''' True once key is loaded, so get() won't wait '''
+        with self.cond:
+            return key in self.results
+
+    def get(self, key):
+        ''' Return prefetched data for key, waiting if it's being loaded.
+        Returns None if the key was never scheduled. '''
+        with self.cond:
+            while key in self.loading:
+                self.cond.wait()
+            if key in self.queue:
+                self.queue.remove(key)
+            return self.results.pop(key, None)
@@ -34,17 +34,49 @@ from object3d import Object3d, filename_frame
 from shader import Shader
 from parameter import Parameter, Histogram
 from keys import keys
+from prefetch import Prefetcher, frame_window
+from cache import LRUCache
+from diskcache import DiskCache, gunzip
+from frameindex import FrameIndex
+from glbuffer import StreamBuffer
+from octree import Octree
+from pick import ConePicker
+from selection import screen_positions, box_mask, lasso_mask, selection_stats
+from stats import attribute_stats, StatsWorker
+from histcache import HistogramCache, histogram_entry
+from seqstats import SequenceStats
 
 import ctypes
 from ctypes import pointer, sizeof
 
 import os
-import partio
+import itertools
+import pdbio
+
+# partio is only needed for formats other than pdb
+try:
+    import partio
+except ImportError:
+    partio = None
 
 glsl_util = ''.join(open('util.glsl').readlines())
 
-tempcache = {}
-histogram_cache = {}
+histogram_cache = HistogramCache(32*1024**2)
+
+# decompressed .pdb.gz files, kept between sessions
+gz_cache_dir = os.path.join(os.path.expanduser('~'), '.cache', 'pyglet-bits', 'pdb')
+gz_cache = DiskCache(gz_cache_dir, gunzip, 8 * 1024**3, suffix='.pdb32')
+
+# decoded frames, keyed by (filepath, frame, attribute), shared by all Ptcs.
+# 'position' entries are PtcFrames, other attributes are PtcAttrs
+frame_cache = LRUCache(2048 * 1024**2)
+
+# scratch buffers for Ptc.intersect, reused between picks
+picker = ConePicker()
+
+def update_frame_cache():
+    frame_cache.set_budget(int(Ptc.cache_size.value) * 1024**2)
+    Ptc.cache_stats.value = frame_cache.stats()
 
 class PtcHandler(object):
     ''' Handle user interaction (mouse/keyboard input) '''
@@ -52,6 +84,11 @@ class PtcHandler(object):
         self.scene = scene
         self.window = window
 
+        # screen space region being selected, while dragging with B (box) or L (lasso) held
+        self.region = None
+        self.region_mode = None
+        scene.overlays.append(self)
+
     def on_key_press(self, symbol, modifiers):
         if symbol in (pyglet.window.key.LCTRL, pyglet.window.key.RCTRL):
             cursor = self.window.get_system_mouse_cursor(self.window.CURSOR_CROSSHAIR)
@@ -62,6 +99,11 @@ class PtcHandler(object):
             self.window.set_mouse_cursor(cursor)
 
     def on_mouse_press(self, x, y, buttons, modifiers):
+        if buttons & mouse.LEFT and (keys[key.B] or keys[key.L]):
+            self.region_mode = 'box' if keys[key.B] else 'lasso'
+            self.region = [(x, y), (x, y)]
+            return pyglet.event.EVENT_HANDLED
+
         if buttons & mouse.LEFT and modifiers & key.MOD_CTRL:
 
             ray = self.scene.camera.project_ray(x, y)
@@ -83,6 +125,13 @@ class PtcHandler(object):
     
     def on_mouse_drag(self, x, y, dx, dy, buttons, modifiers):
 
+        if self.region is not None:
+            if self.region_mode == 'box':
+                self.region[1] = (x, y)
+            else:
+                self.region.append( (x, y) )
+            return pyglet.event.EVENT_HANDLED
+
         if keys[key.E]:
             if buttons & mouse.LEFT:
                 Ptc.exposure.value = Ptc.exposure.value + dx*0.01
@@ -92,10 +141,256 @@ class PtcHandler(object):
                 Ptc.gamma.value = Ptc.gamma.value + dx*0.01
                 return pyglet.event.EVENT_HANDLED
 
+    def on_mouse_release(self, x, y, buttons, modifiers):
+        if self.region is None:
+            return
+
+        # shift adds to the existing selection
+        extend = modifiers & key.MOD_SHIFT
+        for ptcloud in self.scene.pointclouds:
+            if self.region_mode == 'box':
+                (x0, y0), (x1, y1) = self.region
+                ptcloud.select(self.scene.camera, box=(x0, y0, x1, y1), extend=extend)
+            else:
+                ptcloud.select(self.scene.camera, lasso=self.region, extend=extend)
+
+        self.region = None
+        return pyglet.event.EVENT_HANDLED
+
+    def draw_overlay(self):
+        if self.region is None:
+            return
+
+        if self.region_mode == 'box':
+            (x0, y0), (x1, y1) = self.region
+            coords = [x0, y0, x1, y0, x1, y1, x0, y1]
+        else:
+            coords = [c for pt in self.region for c in pt]
+
+        glColor4f(1.0, 1.0, 1.0, 0.8)
+        pyglet.graphics.draw(len(coords)//2, GL_LINE_LOOP, ('v2f', coords))
+
 
 def valid_file(filename):
     return os.path.exists(filename) and os.path.getsize(filename) > 10000
 
+def read_ptc_file(filename):
+    if filename[-7:] == '.pdb.gz':
+        filename = gz_cache.get(filename)
+
+    # pdb files are read directly, memory mapping attribute data where possible
+    if pdbio.is_pdb(filename):
+        try:
+            return pdbio.PdbFile(filename, mmap=True)
+        except pdbio.PdbError:
+            if partio is None:
+                raise
+
+    if partio is None:
+        raise IOError('partio is required to read %s' % filename)
+    return partio.read(filename)
+
+def read_attribute(ptc, attr, numparts):
+    ''' Read all values of an attribute into a flat float32 array '''
+    if hasattr(ptc, "getArray"):  # using an addition to partio py api
+        return ptc.getArray(attr).astype(np.float32, copy=False)
+
+    values = itertools.chain.from_iterable( ptc.get(attr, i) for i in xrange(numparts) )
+    return np.fromiter(values, dtype=np.float32, count=numparts*attr.count)
+
+def default_attribute(attrs, userattr=''):
+    ''' Attribute to colour points by, preferring the user's choice '''
+    if userattr != '' and userattr in attrs.keys():
+        return userattr
+    for aname in ('Cd', '_radiosity', 'velocity'):
+        if aname in attrs.keys():
+            return aname
+    return None
+
+class PtcFrame(object):
+    ''' Positions and attribute info for a single frame of point cloud data '''
+    def __init__(self, filename):
+        self.filename = filename
+        self.numparts = 0
+        self.attrs = {}
+        self.verts = None
+        self.bbmin = None
+        self.bbmax = None
+        self.info = None    # FrameIndex entry, if the frame was indexed
+        self._order = None
+        self._octree = None
+
+    @property
+    def order(self):
+        ''' Random permutation of the particles. Any prefix of it is an even
+        sample of the whole cloud, used for decimation '''
+        if self._order is None:
+            self._order = np.random.RandomState(self.numparts).permutation(self.numparts).astype(np.int32)
+        return self._order
+
+    @property
+    def octree(self):
+        ''' Octree of the particles, for level of detail '''
+        if self._octree is None:
+            self._octree = Octree(self.verts, self.bbmin, self.bbmax)
+        return self._octree
+
+    @property
+    def nbytes(self):
+        nbytes = self.verts.nbytes if self.verts is not None else 0
+        if self._order is not None:
+            nbytes += self._order.nbytes
+        if self._octree is not None:
+            nbytes += self._octree.nbytes
+        return nbytes
+
+class PtcAttr(object):
+    ''' Values of one attribute for a single frame '''
+    def __init__(self, name, count, data):
+        self.name = name
+        self.count = count
+        self.data = data    # as stored in the file
+
+    @property
+    def cols(self):
+        ''' Values expanded to rgb, for the VBO '''
+        return self.data.repeat(3) if self.count == 1 else self.data
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    def subset(self, order):
+        ''' PtcAttr of the values for the particle indices in order '''
+        return PtcAttr(self.name, self.count, self.data.reshape(-1, self.count)[order].ravel())
+
+def compact_vertices(verts, bbmin, bbmax, attr=None, quantize=True, half=True):
+    '''Interleave positions and colours into a single array for the GPU.
+    Positions are stored as 16 bit fractions of the bbox when quantize is set,
+    rgb colours as half floats when half is set, and single channel attributes
+    as one float, expanded to rgb in the shader'''
+    v = verts.reshape(-1,3)
+
+    fields = [ ('position', 'u2', 4) if quantize else ('position', 'f4', 3) ]
+    if attr is not None:
+        if attr.count == 1:
+            fields.append( ('color', 'f4') )
+        elif half:
+            fields.append( ('color', 'f2', 4) )
+        else:
+            fields.append( ('color', 'f4', 3) )
+    vertices = np.empty(len(v), dtype=fields)
+
+    if quantize:
+        lo = np.array(bbmin[:], dtype=np.float32)
+        size = np.array(bbmax[:], dtype=np.float32) - lo
+        size[size == 0] = 1
+        position = vertices['position']
+        position[:,:3] = np.rint((v - lo) * (65535.0 / size))
+        position[:,3] = 0
+    else:
+        vertices['position'] = v
+
+    if attr is None:
+        pass
+    elif attr.count == 1:
+        vertices['color'] = attr.data
+    elif half:
+        vertices['color'][:,:3] = attr.data.reshape(-1,3)
+        vertices['color'][:,3] = 1
+    else:
+        vertices['color'] = attr.data.reshape(-1,3)
+
+    return vertices
+
+def load_frame(filename, ptc=None, info=None):
+    '''Read the attribute info and positions of a point cloud file into a PtcFrame,
+    or None if it can't be read. Safe to call from prefetch threads, no GL or Parameter access.
+    info is the frame's FrameIndex entry, if there is one'''
+
+    if ptc is None:
+        if not valid_file(filename):
+            return None
+        ptc = read_ptc_file(filename)
+    if ptc is None: return None
+
+    frame = PtcFrame(filename)
+
+    # Retrieve attribute info
+    frame.numparts = ptc.numParticles()
+    for i in range(ptc.numAttributes()):
+        frame.attrs[ptc.attributeInfo(i).name] = ptc.attributeInfo(i)
+
+    if 'position' in frame.attrs.keys():
+        posattr = frame.attrs['position']
+
+    frame.verts = read_attribute(ptc, posattr, frame.numparts)
+
+    # calculate bbox min and max
+    frame.info = info
+    if info is not None:
+        frame.bbmin = Point3(*info['bbmin'])
+        frame.bbmax = Point3(*info['bbmax'])
+    else:
+        v = frame.verts.reshape(-1,3)
+        frame.bbmin = Point3( np.min(v[:,0]), np.min(v[:,1]), np.min(v[:,2]) )
+        frame.bbmax = Point3( np.max(v[:,0]), np.max(v[:,1]), np.max(v[:,2]) )
+
+    return frame
+
+def describe_frame(filename):
+    '''Metadata for a FrameIndex: particle count, attribute types, bbox and
+    per attribute min/max/mean'''
+    # .pdb.gz frames are read streaming rather than decompressed into gz_cache, so
+    # indexing the whole sequence doesn't evict the frames prefetched for playback
+    if filename[-7:] == '.pdb.gz':
+        ptc = pdbio.PdbFile(filename)
+    else:
+        ptc = read_ptc_file(filename)
+    frame = load_frame(filename, ptc)
+    if frame is None or frame.numparts == 0:
+        return None
+
+    info = {'numparts': frame.numparts,
+            'attrs': {},
+            'bbmin': [float(frame.bbmin.x), float(frame.bbmin.y), float(frame.bbmin.z)],
+            'bbmax': [float(frame.bbmax.x), float(frame.bbmax.y), float(frame.bbmax.z)],
+            'stats': {} }
+
+    for name, attr in frame.attrs.items():
+        info['attrs'][name] = [int(attr.type), attr.count]
+        if attr.type not in (pdbio.VECTOR, pdbio.FLOAT, pdbio.INT):
+            continue
+        a = read_attribute(ptc, attr, frame.numparts).reshape(-1, attr.count)
+        info['stats'][name] = {'min': a.min(axis=0).tolist(),
+                               'max': a.max(axis=0).tolist(),
+                               'mean': a.mean(axis=0, dtype=np.float64).tolist() }
+    return info
+
+def entry_histogram(entry, attr_name):
+    '''Histogram parameter value from a histogram cache entry'''
+    count = len(entry['counts'])
+    bins = len(entry['counts'][0])
+    histogram = Histogram()
+    for i in range(count):
+        h = np.array(entry['counts'][i], dtype=np.float64)
+        if count == 3 and attr_name in ('Cd', '_radiosity'):
+            h = np.power(h, 1/2.2)  # force gamma 2.2 in histogram for colours
+        edges = np.linspace(entry['lo'][i], entry['hi'][i], bins+1)
+        hist = np.column_stack((edges[1:], h))   # somethign nicer for the bins?
+        histogram.arrays.append( hist )
+    return histogram
+
+def load_attribute(frame, aname, ptc=None):
+    '''Read a single attribute of an already loaded frame into a PtcAttr'''
+    colattr = frame.attrs.get(aname)
+    if colattr is None: return None
+
+    if ptc is None:
+        ptc = read_ptc_file(frame.filename)
+    data = read_attribute(ptc, colattr, frame.numparts)
+    return PtcAttr(aname, colattr.count, data)
+
 class Ptc(Object3d):
 
     # GLSL Shaders below
@@ -112,11 +407,30 @@ class Ptc(Object3d):
     }
     '''
 
+    # for compact_vertices(), positions relative to the bbox and single channel colours
+    compact_vertex_shader = glsl_util+'''
+    uniform mat4 modelview;
+    uniform mat4 projection;
+    uniform vec3 bbmin;
+    uniform vec3 bbsize;
+    uniform float scalar;
+    attribute vec3 position;
+    attribute vec3 color;
+    void main() {
+        if (scalar > 0.0)
+            gl_FrontColor = vec4(color.rrr, 1.0);
+        else
+            gl_FrontColor = vec4(color, 1.0);
+
+        vec4 modelSpacePos = modelview * vec4(bbmin + position*bbsize, 1.0);
+        gl_Position = projection * modelSpacePos;
+    }
+    '''
+
     fragment_shader = glsl_util+'''
     uniform float gamma;
     uniform float exposure;
     uniform float hueoffset;
-    uniform float decimate;
 
     void main(void) {
         float gain = pow(2.0, exposure);
@@ -128,12 +442,6 @@ class Ptc(Object3d):
         gl_FragColor.g = pow(rgba.g*gain, 1.0/gamma);
         gl_FragColor.b = pow(rgba.b*gain, 1.0/gamma);
         gl_FragColor.a = 1.0;
-
-        //if (decimate < 1.0) {
-        //    float r  = rand(gl_PrimitiveID);
-        //    if ( r > decimate) gl_FragColor.a = 0.0;
-        // }
-
     }
     '''
     
@@ -143,211 +451,557 @@ class Ptc(Object3d):
     gain =      Parameter(default=1.0, vmin=0.0, vmax=3.0, title='Gain')
     hueoffset = Parameter(default=0.0, vmin=-1.0, vmax=1.0, title='Hue Offset')
     ptsize =    Parameter(default=2.0, vmin=-1.0, vmax=1.0, title='Point Size')
+    cache_size = Parameter(default=2048, vmin=0, vmax=65536, title='Frame Cache (MB)', update=update_frame_cache)
+    cache_stats = Parameter(default='', title='')
+    compact = Parameter(default=False, title='Compact Vertices')
+    lod = Parameter(default=False, title='Level of Detail')
+    point_budget = Parameter(default=5.0, vmin=0.1, vmax=100.0, title='Point Budget (M)')
+    cull = Parameter(default=False, title='Frustum Culling')
 
     pos_attrs = ['position']
 
+    # number of frames to load ahead of the current one during playback/scrubbing
+    prefetch_frames = 4
+    # number of compressed frames to decompress ahead
+    decompress_frames = 16
+
+    # bytes uploaded to the GPU per redraw when changing frames, 0 uploads a whole frame at once
+    upload_chunk = 0
+
+    # bins in attribute histograms
+    histogram_bins = 64
+
+    # compact vertex format options, see compact_vertices()
+    compact_quantize = True
+    compact_half = True
+
     # OpenGL Vertex Buffer management
     def init_buffers(self):
-        self.vbo_vert_id = GLuint()
-        self.vbo_col_id = GLuint()
-        glGenBuffers(1, pointer(self.vbo_vert_id))
-        glGenBuffers(1, pointer(self.vbo_col_id))
-
-    def update_buffers(self):
-        if not hasattr(self, "verts"): return
-        self.vbo_vert_data = self.verts.ctypes.data_as(ctypes.POINTER(ctypes.c_float))
-        glBindBuffer(GL_ARRAY_BUFFER, self.vbo_vert_id)
-        glBufferData(GL_ARRAY_BUFFER, sizeof(ctypes.c_float)*len(self.verts), self.vbo_vert_data, GL_STATIC_DRAW)
-
-        if not hasattr(self, "cols"): return
-        self.vbo_col_data = self.cols.ctypes.data_as(ctypes.POINTER(ctypes.c_float))
-        glBindBuffer(GL_ARRAY_BUFFER, self.vbo_col_id)
-        glBufferData(GL_ARRAY_BUFFER, sizeof(ctypes.c_float)*len(self.cols), self.vbo_col_data, GL_STATIC_DRAW)
+        self.vbo_verts = StreamBuffer()
+        self.vbo_cols = StreamBuffer()
+
+    def update_buffers(self, verts=True):
+        ''' Start uploading the current frame, it's drawn once the upload completes '''
+        if not hasattr(self, "verts") or self.verts is None: return
+
+        # with level of detail or culling, upload everything in octree order and draw part of
+        # each leaf, otherwise when decimating, only upload a random sample of the particles
+        octree = self.frame_data.octree if self.uses_octree() else None
+        if octree is not None:
+            numparts = self.numparts
+            order = octree.order
+        else:
+            numparts = self.decimated_parts()
+            order = self.frame_data.order[:numparts] if numparts < self.numparts else None
+        self.charge_frame()
+
+        verts = verts or numparts != self.uploaded_parts or self.vbo_verts.layout != self.verts.dtype \
+            or octree is not self.upload_octree
+        pverts, attr = self.verts, self.attr
+        if order is not None:
+            if verts or self.compact.value:
+                pverts = self.verts.reshape(-1,3)[order].ravel()
+            if attr is not None:
+                attr = attr.subset(order)
+        self.uploaded_parts = numparts
+        self.upload_sampled = octree is None and order is not None
+        self.upload_octree = octree
+        self.octree_layout = self.uses_octree()
+
+        self.compact_layout = self.compact.value
+        if self.compact_layout:
+            # positions and colours interleaved in vbo_verts
+            self.vbo_verts.upload( compact_vertices(pverts, self.bbmin, self.bbmax, attr,
+                                   self.compact_quantize, self.compact_half) )
+        else:
+            if verts:
+                self.vbo_verts.upload(pverts)
+            self.vbo_cols.upload(attr.cols if attr is not None else np.empty(0, np.float32))
+        self.upload_bbox = (self.bbmin, self.bbmax)
+
+        if self.upload_chunk <= 0:
+            self.upload_buffers()
+
+    def upload_buffers(self):
+        ''' Continue uploading, and swap to the new buffers once all are complete '''
+        done = self.vbo_verts.step(self.upload_chunk)
+        done = self.vbo_cols.step(self.upload_chunk) and done
+        if done:
+            self.vbo_verts.swap()
+            self.vbo_cols.swap()
+            self.compact_bbox = self.upload_bbox
+            self.draw_octree = self.upload_octree
+
+    def uses_octree(self):
+        return self.lod.value or self.cull.value
+
+    def decimated_parts(self):
+        return int(math.ceil(self.decimate.value * self.numparts))
+
+    def charge_frame(self):
+        '''The frame's order and octree are built on first use, count them in the frame cache'''
+        frame_cache.resize((self.filepath, self.data_frame, 'position'))
+
+    def update_decimate(self):
+        '''Fewer particles are drawn from what's uploaded, more need uploading.
+        Drawing fewer needs the upload in random order, or the prefix drawn is biased
+        towards the start of the file'''
+        if not self.ptc_loaded or self.uses_octree():
+            return
+        numparts = self.decimated_parts()
+        if numparts > self.uploaded_parts or (numparts < self.numparts and not self.upload_sampled):
+            self.update_buffers()
 
     def delete_buffers(self):
-        glDeleteBuffers(1, self.vbo_vert_id)
-        glDeleteBuffers(1, self.vbo_col_id)
+        self.vbo_verts.delete()
+        self.vbo_cols.delete()
 
     def update_visibility(self):
         if self.visible.value == False:
             self.delete_buffers()
         elif self.visible.value == True:
-            if not glIsBuffer(self.vbo_vert_id) and not glIsBuffer(self.vbo_col_id):
-                self.init_buffers()
+            if not self.vbo_verts.exists() and not self.vbo_cols.exists():
+                self.vbo_verts.init()
+                self.vbo_cols.init()
             self.update_buffers()
 
     def __init__(self, scene, filepath, *args, **kwargs):
         super(Ptc, self).__init__(scene, *args, **kwargs)
 
         self.visible = Parameter(default=True, title='Visible', update=self.update_visibility)
+        self.scene = scene
         self.filepath = filepath
         self.filename = ''  # after frame conversion
         self.frame = None
-        self.vbo_vert_data = None
-        self.vbo_col_data = None
+        self.frame_data = None   # PtcFrame currently loaded
+        self.attr = None         # and PtcAttr for its colours
+        self.numparts = 0
+        self.uploaded_parts = 0  # particles in the VBOs, after decimation
+        self.upload_sampled = False # VBOs hold a random permutation, so any prefix is a fair sample
+        self.compact_layout = False
+        self.upload_bbox = None  # bbox of the frame being uploaded
+        self.compact_bbox = None # and of the one being drawn
+        self.octree_layout = False
+        self.upload_octree = None
+        self.draw_octree = None
+        self.drawn_parts = 0
+        self.draw_stats = Parameter(default='', title='')
+        self.data_frame = None   # and its frame number
         self.ptc_loaded = False
 
         # object-specific parameters
-        self.decimate = Parameter(default=1.0, vmin=0.0, vmax=1.0, title='Decimate')
+        self.decimate = Parameter(default=1.0, vmin=0.0, vmax=1.0, title='Decimate', update=self.update_decimate)
         self.num_particles = Parameter(default=0, title='Num particles: ')
-        self.attributes = Parameter(default='', title='', update=self.read_ptc_attrs_data)
+        self.attributes = Parameter(default='', title='', update=self.update_attribute)
         self.attr_stats = Parameter(default='', title='')
         self.histogram = Parameter(default=Histogram(), title='')
         self.show_statistics = Parameter(default=True, title='Update Stats')
+        self.selection = None   # boolean mask of selected particles
+        self.selection_stats = Parameter(default='', title='')
+        self.sequence = SequenceStats()
+        self.sequence_stats = Parameter(default='', title='')
+        self.timeline = Parameter(default=Histogram(), title='')
+        self.sequence_histogram = Parameter(default=Histogram(), title='')
         
         # create VBOs
         self.init_buffers()
+        self.compact_shader = Shader(self.compact_vertex_shader, self.fragment_shader)
+
+        self.prefetcher = Prefetcher(self.read_frame)
+        self.stats_worker = StatsWorker()
+        self.index = FrameIndex(filepath)
+
+        # show what's known from the index straight away, and load the
+        # points in the background. without it, the bounds are needed now
+        self.frame = int(scene.frame.value)
+        info = self.index.get(filename_frame(filepath, self.frame))
+        if info is not None:
+            self.num_particles.value = info['numparts']
+            self.attributes.enum = [ (i, i) for i in info['attrs'].keys() if i not in self.pos_attrs ]
+            self.bbmin = Point3(*info['bbmin'])
+            self.bbmax = Point3(*info['bbmax'])
+            self.prefetcher.schedule([ (self.filepath, self.frame, self.attributes.value) ])
+            pyglet.clock.schedule_interval(self.poll_frame, 1/30.)
+        else:
+            # load ptc, store in self.verts/self.cols, update VBOs if loaded
+            self.read_ptc_attrs_data()
 
-        # load ptc, store in self.verts/self.cols, update VBOs if loaded
-        self.frame = scene.frame.value
-        self.read_ptc_attrs_data()
+        # index the rest of the sequence in the background
+        frames = range(int(scene.sframe.value), int(scene.eframe.value)+1)
+        self.index.build([ filename_frame(filepath, f) for f in frames ], describe_frame)
 
 
     def read_ptc_attrs_data(self):
-        ptc = self.open_ptc()
+        self.filename = filename_frame(self.filepath, self.frame)
+
+        key = (self.filepath, self.frame, self.attributes.value)
+        frame = frame_cache.get((self.filepath, self.frame, 'position'))
+        attr = None
+        if frame is not None:
+            aname = default_attribute(frame.attrs, self.attributes.value)
+            attr = frame_cache.get((self.filepath, self.frame, aname))
+
+        if frame is None or (attr is None and aname is not None):
+            loaded = self.prefetcher.get(key)
+            if loaded is None:
+                loaded = self.read_frame(key)
+            if loaded is None: return
+            frame, attr = loaded
+
+        Ptc.cache_stats.value = frame_cache.stats()
+        self.data_frame = self.frame
+        self.read_ptc_data(frame)
+        self.read_attr_data(attr)
+        self.update_buffers()
+
+    def poll_frame(self, dt):
+        '''Take the first frame once the prefetcher has loaded it. Changing
+        frame or attribute meanwhile loads straight away instead'''
+        key = (self.filepath, self.frame, self.attributes.value)
+        if self.ptc_loaded or self.prefetcher.ready(key):
+            pyglet.clock.unschedule(self.poll_frame)
+            if not self.ptc_loaded:
+                self.read_ptc_attrs_data()
+
+    def update_attribute(self):
+        '''Colour attribute changed, read only that attribute of the current frame'''
+        if not self.ptc_loaded:
+            return self.read_ptc_attrs_data()
+
+        frame = self.frame_data
+        key = (self.filepath, self.data_frame, default_attribute(frame.attrs, self.attributes.value))
+        attr = frame_cache.get(key)
+        if attr is None:
+            try:
+                attr = load_attribute(frame, key[2])
+            except (pdbio.PdbError, IOError):
+                attr = None     # the file has changed since the frame was read
+            if attr is not None:
+                frame_cache.put(key, attr)
+
+        Ptc.cache_stats.value = frame_cache.stats()
+        self.read_attr_data(attr)
+        self.update_buffers(verts=False)
+
+    def read_frame(self, key):
+        '''Load positions and the colour attribute for a (filepath, frame, attribute) key
+        into the frame cache, called from prefetch threads. None if the frame can't be
+        read, such as one still being written'''
+        try:
+            return self.read_frame_data(key)
+        except (pdbio.PdbError, IOError):
+            return None
+
+    def read_frame_data(self, key):
+        filepath, f, userattr = key
+        ptc = None
+
+        frame = frame_cache.peek((filepath, f, 'position'))
+        if frame is None:
+            filename = filename_frame(filepath, f)
+            if not valid_file(filename): return None
+            ptc = read_ptc_file(filename)
+            frame = load_frame(filename, ptc, self.index.get(filename))
+            if frame is None: return None
+            if self.uses_octree():
+                frame.octree    # build here rather than when drawing
+            elif self.decimate.value < 1.0:
+                frame.order
+            frame_cache.put((filepath, f, 'position'), frame)
+
+        aname = default_attribute(frame.attrs, userattr)
+        attr = frame_cache.peek((filepath, f, aname))
+        if attr is None and aname is not None:
+            attr = load_attribute(frame, aname, ptc)
+            frame_cache.put((filepath, f, aname), attr)
+
+        return frame, attr
+
+    def calc_attribute_stats(self, attr_array, count, attr_name, summary=None):
+        '''summary is an attribute's min/max/mean from the frame index, if available.
+        Unless the histogram is cached too, stats are computed by the stats worker
+        and shown by poll_stats() when ready, meanwhile the previous ones stay up'''
+        self.stats_worker.cancel()
+        pyglet.clock.unschedule(self.poll_stats)
+
+        if not self.show_statistics.value:
+            self.attr_stats.value = ''
+            self.histogram.value = Histogram()
+            return
+        if count not in (1, 3):
+            self.attr_stats.value = ''
+            return
+
+        filename, bins, index = self.filename, self.histogram_bins, self.index
+        entry = histogram_cache.get(filename, attr_name, bins, index)
+        if entry is not None and summary is not None:
+            return self.show_attribute_stats(count, attr_name, entry, summary)
+
+        def job(cancelled):
+            # stats and histograms together in one pass over the data,
+            # or two if the value range isn't known from the index
+            ranges = zip(summary['min'], summary['max']) if summary is not None else None
+            stats = attribute_stats(attr_array, count, bins=bins, ranges=ranges, cancelled=cancelled)
+            if stats is None:
+                return None
+            stats_entry = histogram_entry(stats)
+            if entry is None:
+                histogram_cache.put(filename, attr_name, bins, stats_entry, index)
+            return stats_entry, {'min': stats.min, 'max': stats.max, 'mean': stats.mean}
+
+        self.stats_worker.submit(job)
+        pyglet.clock.schedule_interval(self.poll_stats, 1/30.)
+
+    def poll_stats(self, dt):
+        '''Show the stats worker's results once it's finished'''
+        finished, result = self.stats_worker.poll()
+        if not finished:
+            return
+        pyglet.clock.unschedule(self.poll_stats)
+        if result is None or self.attr is None:
+            return
+        entry, summary = result
+        self.show_attribute_stats(self.attr.count, self.attr.name, entry, summary)
+
+    def show_attribute_stats(self, count, attr_name, entry, summary):
+        '''Update the histogram and stats text from a histogram cache entry and min/max/mean'''
+        self.histogram.value = entry_histogram(entry, attr_name)
+
+        if count == 3:
+            self.attr_stats.value = 'Min:  %.3f %.3f %.3f \nMax: %.3f %.3f %.3f \nAvg:  %.3f %.3f %.3f' % \
+                (tuple(summary['min']) + tuple(summary['max']) + tuple(summary['mean']))
+        else:
+            self.attr_stats.value = 'Min:  %.3f \nMax: %.3f \nAvg:  %.3f' % \
+                (summary['min'][0], summary['max'][0], summary['mean'][0])
+
+
+    def calc_sequence_stats(self):
+        '''Start summarising the colour attribute over the scene's frame range'''
+        aname = self.attr.name if self.attr is not None else self.attributes.value
+        if aname == '':
+            return
+        scene = self.scene
+        frames = range(int(scene.sframe.value), int(scene.eframe.value)+1)
+        self.sequence.start(dict( (f, filename_frame(self.filepath, f)) for f in frames ), aname)
+
+        self.sequence_stats.value = '%s: 0/%d frames' % (aname, self.sequence.total)
+        self.timeline.value = Histogram()
+        self.sequence_histogram.value = Histogram()
+        pyglet.clock.unschedule(self.poll_sequence_stats)
+        pyglet.clock.schedule_interval(self.poll_sequence_stats, 0.25)
+
+    def poll_sequence_stats(self, dt):
+        '''Show sequence stats of the frames done so far'''
+        seq = self.sequence
+        if len(seq.poll()) == 0 and not seq.done:
+            return
+        if seq.done:
+            pyglet.clock.unschedule(self.poll_sequence_stats)
+
+        text = '%s: %d/%d frames' % (seq.attr_name, len(seq.frames), seq.total)
+        merged = seq.merged()
+        if merged is not None:
+            text += '\nMin: %s \nMax: %s \nAvg: %s' % tuple(' '.join('%.3f' % v for v in merged[k]) \
+                                                          for k in ('min', 'max', 'mean'))
+            if merged['nonfinite'] > 0:
+                text += '\nNaN/inf: %d' % merged['nonfinite']
+            self.sequence_histogram.value = entry_histogram({'lo': merged['lo'], 'hi': merged['hi'],
+                                                             'counts': merged['hist']}, seq.attr_name)
+
+            # largest magnitude in each frame, flat lines can't be drawn
+            frames, peaks = seq.peaks()
+            timeline = Histogram()
+            if len(frames) > 1:
+                for c in range(peaks.shape[1]):
+                    if np.ptp(peaks[:,c]) > 0:
+                        timeline.arrays.append( np.column_stack((frames, peaks[:,c])).astype(np.float64) )
+            self.timeline.value = timeline
+
+        outliers = seq.outliers()
+        if len(outliers) > 0:
+            text += '\nOutliers: %s' % ', '.join(str(f) for f in outliers[:10])
+            if len(outliers) > 10:
+                text += ' ...'
+        self.sequence_stats.value = text
+
+    def read_ptc_data(self, frame):
+        '''Take positions and attribute info from a loaded PtcFrame '''
+
+        if frame is not self.frame_data:
+            self.clear_selection()
+
+        self.frame_data = frame
+        self.numparts = frame.numparts
+        self.num_particles.value = self.numparts
+        self.attrs = frame.attrs
 
         # init attribute list from ptc
         self.attributes.enum = [ (i, i) for i in self.attrs.keys() if i not in self.pos_attrs ]
 
-        self.read_ptc_data(ptc)
-        self.update_buffers()
+        self.verts = frame.verts
+        self.bbmin = frame.bbmin
+        self.bbmax = frame.bbmax
+        self.ptc_loaded = True
 
-    def read_partio(self, filename):
-        if filename[-7:] == '.pdb.gz':
-            global tempcache
-            import tempfile
-            import gzip
+    def read_attr_data(self, attr):
+        '''Take colours from a loaded PtcAttr '''
+        self.attr = attr
+        if attr is None:
+            self.calc_attribute_stats(None, 0, '')
+            return
 
-            if filename in tempcache.keys():
-                ptc = partio.read(tempcache[filename].name)
-            else:
-                tmpf = tempfile.NamedTemporaryFile(suffix='.pdb32')
-                gzf = gzip.open(filename)
-                tmpf.write(gzf.read())
-                gzf.close()
-                ptc = partio.read(tmpf.name)
-                
-                tempcache[filename] = tmpf
-                # tmpf.close()  # python will close and remove temp files on exit
+        if attr.name != self.attributes.value:
+            self.attributes.data = attr.name    # XXX bypassing update function.. needs better implementation
 
+        info = self.frame_data.info
+        summary = info['stats'].get(attr.name) if info is not None else None
+        self.calc_attribute_stats(attr.data, attr.count, attr.name, summary)
+        self.update_selection_stats()
+
+    def select(self, camera, box=None, lasso=None, extend=False):
+        '''Select the particles within a screen space box (x0, y0, x1, y1)
+        or lasso [(x,y), ...]'''
+        if not self.visible.value or not self.ptc_loaded:
+            return
+
+        width, height = camera.window.get_size()
+        mvp = camera.persp_matrix * camera.matrixinv * self.matrix()
+        screen = screen_positions(self.verts, mvp, width, height)
+        if box is not None:
+            mask = box_mask(screen, *box)
         else:
-            ptc = partio.read(filename)
+            mask = lasso_mask(screen, lasso)
 
-        return ptc
+        if extend and self.selection is not None:
+            mask |= self.selection
+        self.selection = mask
+        self.update_selection_stats()
 
-    def open_ptc(self):
-        '''Open a partio point cloud and retrieve attribute info'''
-        
-        self.filename = filename_frame(self.filepath, self.frame)
-        if not valid_file(self.filename):
-            return None
-            
-        ptc = self.read_partio(self.filename)
-        if ptc is None: return None
+    def clear_selection(self):
+        self.selection = None
+        self.selection_stats.value = ''
 
-        # Retrieve attribute info
-        self.numparts = ptc.numParticles()
-        self.num_particles.value = self.numparts
-        self.attrs = {}
-        for i in range(ptc.numAttributes()):
-            self.attrs[ptc.attributeInfo(i).name] = ptc.attributeInfo(i)
-
-        return ptc
-
-    def calc_attribute_stats(self, attr_array, count, attr_name):
-        if self.show_statistics.value:
-
-            if count == 3:
-                a = attr_array.reshape(-1,3)
-                self.attr_stats.value = 'Min:  %.3f %.3f %.3f \nMax: %.3f %.3f %.3f \nAvg:  %.3f %.3f %.3f' % \
-                    (a[:,0].min(), a[:,1].min(), a[:,2].min(), \
-                    a[:,0].max(), a[:,1].max(), a[:,2].max(), \
-                    a[:,0].mean(), a[:,1].mean(), a[:,2].mean() )
-
-                if self.filename+attr_name in histogram_cache.keys():
-                    self.histogram.value = histogram_cache[self.filename+attr_name]
-                else:
-                    histogram = Histogram()
-                    for i in range(3):
-                        h, bins = np.histogram(a[:,i], bins=64, new=True)
-                        if attr_name in ('Cd', '_radiosity'):
-                            h = np.power(h, 1/2.2)  # force gamma 2.2 in histogram for colours
-                        hist = np.column_stack((bins[1:], h))
-                        histogram.arrays.append( hist )
-                    self.histogram.value = histogram
-                    histogram_cache[self.filename+attr_name] = self.histogram.value
-
-            elif count == 1:
-                a = attr_array
-                self.attr_stats.value = 'Min:  %.3f \nMax: %.3f \nAvg:  %.3f' % \
-                    (a.min(), a.max(), a.mean())
-
-                if self.filename+attr_name in histogram_cache.keys():
-                    self.histogram.value = histogram_cache[self.filename+attr_name]
-                else:
-                    h, bins = np.histogram(a, bins=64)
-                    hist = np.column_stack((bins[1:], h))   # somethign nicer for the bins?
-                    histogram = Histogram()
-                    histogram.arrays = [hist]
-                    self.histogram.value = histogram
-                    histogram_cache[self.filename+attr_name] = self.histogram.value
-            else:
-                self.attr_stats.value = ''
+    def update_selection_stats(self):
+        if self.selection is None:
+            return
 
-        else:
-            self.attr_stats.value = ''
-            self.histogram.value = Histogram()
+        stats = selection_stats(self.verts, self.selection, self.attr)
+        text = 'Selected: %d' % stats['count']
+        if stats['count'] > 0:
+            text += '\nBBox: %.3f %.3f %.3f \n      %.3f %.3f %.3f' % (tuple(stats['bbmin']) + tuple(stats['bbmax']))
+        if 'attr' in stats:
+            text += '\n%s Min: %s \n%s Max: %s' % (stats['attr'], ' '.join('%.3f' % v for v in stats['min']),
+                                                   stats['attr'], ' '.join('%.3f' % v for v in stats['max']))
+        self.selection_stats.value = text
 
+    def update(self, time, frame, dt=0):
+        frame = int(frame)
+        if frame == self.frame and self.ptc_loaded:
+            return
 
-    def read_ptc_data(self, ptc):
-        '''Read point cloud data into numpy arrays '''
+        if self.scene.playback.value == self.scene.PLAYING:
+            step = 1
+        else:
+            step = frame - self.frame
 
-        if ptc is None: return
+        self.frame = frame
+        self.read_ptc_attrs_data()
+        self.prefetch(step)
+
+    def prefetch(self, step):
+        '''Start loading the next frames in the direction (and speed) of playback or scrubbing'''
+        if step == 0: return
+
+        scene = self.scene
+        loop = scene.playback.value == scene.PLAYING
+        frames = frame_window(self.frame, step, self.prefetch_frames,
+                              int(scene.sframe.value), int(scene.eframe.value), loop)
+        aname = self.attributes.value
+        self.prefetcher.schedule([ (self.filepath, f, aname) for f in frames \
+            if (self.filepath, f, 'position') not in frame_cache or (self.filepath, f, aname) not in frame_cache ])
+
+        if self.filepath[-7:] == '.pdb.gz':
+            frames = frame_window(self.frame, step, self.decompress_frames,
+                                  int(scene.sframe.value), int(scene.eframe.value), loop)
+            gz_cache.prefetch([ filename_frame(self.filepath, f) for f in frames ], owner=self)
+
+    def draw_compact(self, camera):
+        '''Draw the interleaved vertices made by compact_vertices()'''
+        shader = self.compact_shader
+        fields = self.vbo_verts.layout.fields
+        stride = self.vbo_verts.layout.itemsize
+
+        bbmin, bbmax = self.compact_bbox
+        if self.compact_quantize:
+            shader.uniformf('bbmin', *bbmin[:])
+            shader.uniformf('bbsize', *(bbmax - bbmin)[:])
+        else:
+            shader.uniformf('bbmin', 0.0, 0.0, 0.0)
+            shader.uniformf('bbsize', 1.0, 1.0, 1.0)
 
-        if 'position' in self.attrs.keys():
-            posattr = self.attrs['position']
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo_verts.id)
 
-        colattr = None
-        userattr = self.attributes.value
-        if userattr != '' and userattr in self.attrs.keys():
-            colattr = self.attrs[userattr]
-            aname = userattr
+        position = glGetAttribLocation(shader.handle, 'position')
+        if self.compact_quantize:
+            glVertexAttribPointer(position, 3, GL_UNSIGNED_SHORT, GL_TRUE, stride, fields['position'][1])
         else:
-            if 'Cd' in self.attrs.keys():
-                aname = 'Cd'
-            elif '_radiosity' in self.attrs.keys():
-                aname = '_radiosity'
-            elif 'velocity' in self.attrs.keys():
-                aname = 'velocity'
-            colattr = self.attrs[aname]
-            self.attributes.data = aname    # XXX bypassing update function.. needs better implementation
-
-        # load position and colour data
-        if hasattr(ptc, "getArray"):  # using an addition to partio py api
-            self.verts = ptc.getArray(posattr)
-            if colattr is not None:
-                cols = ptc.getArray(colattr)
+            glVertexAttribPointer(position, 3, GL_FLOAT, GL_FALSE, stride, fields['position'][1])
+        glEnableVertexAttribArray(position)
+
+        color = glGetAttribLocation(shader.handle, 'color')
+        if 'color' in fields:
+            dtype, offset = fields['color'][:2]
+            scalar = dtype.shape == ()
+            gltype = GL_HALF_FLOAT if dtype.base == np.float16 else GL_FLOAT
+            glVertexAttribPointer(color, 1 if scalar else 3, gltype, GL_FALSE, stride, offset)
+            glEnableVertexAttribArray(color)
+            shader.uniformf('scalar', 1.0 if scalar else 0.0)
         else:
-            self.verts = np.array([ ptc.get(posattr, i) for i in range(self.numparts)])
-            if colattr is not None:
-                cols = np.array([ ptc.get(colattr, i) for i in range(self.numparts)])
-        del ptc
+            glVertexAttrib3f(color, 1.0, 1.0, 1.0)
+            shader.uniformf('scalar', 0.0)
+
+        self.draw_points(self.vbo_verts.count, camera)
+
+        glDisableVertexAttribArray(position)
+        glDisableVertexAttribArray(color)
+
+    def draw_points(self, numparts, camera):
+        '''Draw the numparts points in the bound vertex arrays. Either the decimated
+        number of them, or part of each octree leaf in the view frustum, within
+        the point budget with level of detail'''
+        octree = self.draw_octree
+        if octree is None or numparts != octree.count.sum():
+            self.drawn_parts = min(numparts, self.decimated_parts())
+            self.update_draw_stats(self.drawn_parts, 0)
+            glDrawArrays( GL_POINTS, 0, self.drawn_parts )
+            return
 
-        self.cols = cols.repeat(3) if colattr.count == 1 else cols
-        self.ptc_loaded = True
+        modelview = camera.matrixinv * self.matrix()
+        visible = octree.visible(camera.persp_matrix, modelview) if self.cull.value else None
 
-        # calculate bbox min and max
-        v = self.verts.reshape(-1,3)
-        self.bbmin = Point3( np.min(v[:,0]), np.min(v[:,1]), np.min(v[:,2]) )
-        self.bbmax = Point3( np.max(v[:,0]), np.max(v[:,1]), np.max(v[:,2]) )
+        if self.lod.value:
+            width, height = camera.window.get_size()
+            budget = self.point_budget.value * 1e6 * self.decimate.value
+            counts = octree.lod_counts(modelview, camera.persp_matrix[5], height, budget, visible)
+        else:
+            counts = np.ceil(octree.count * self.decimate.value).astype(np.int32)
+            if visible is not None:
+                counts[~visible] = 0
 
-        self.calc_attribute_stats(cols, colattr.count, aname)
+        culled = int(octree.count[~visible].sum()) if visible is not None else 0
+        self.drawn_parts = int(counts.sum())
+        self.update_draw_stats(self.drawn_parts, culled)
 
-        
-    def update(self, time, frame, dt=0):
-        self.frame = int(frame)
-        self.read_ptc_attrs_data()
+        glMultiDrawArrays( GL_POINTS, octree.first.ctypes.data_as(ctypes.POINTER(GLint)),
+                           counts.ctypes.data_as(ctypes.POINTER(GLsizei)), len(octree) )
 
+    def update_draw_stats(self, drawn, culled):
+        if drawn == self.numparts and culled == 0:
+            stats = ''
+        else:
+            stats = 'Drawn: %d \nCulled: %d' % (drawn, culled)
+        if stats != self.draw_stats.value:
+            self.draw_stats.value = stats
 
     def intersect(self, ray):
         """
@@ -355,69 +1009,82 @@ class Ptc(Object3d):
         
         Find the points within a specified angle threshold 
         between the ray vector and the vector ray origin->point
-        and take the closest point from that list
-        """
-        dot_thresh = math.cos(math.radians(1))  # 1 degree angle
-        verts = self.verts.reshape(-1,3)
-        
-        # vector ray origin to point
-        rayp = np.array(ray.p[:]).reshape(-1,3).repeat(len(verts), axis=0)
-        v = verts - rayp
-        # normalise
-        v_length = np.sqrt((v ** 2).sum(1)).reshape(-1,1)
-        v /= v_length
-        # dot product (vector to point . ray vector)
-        d = (v * np.array(ray.v)).sum(1)
-        
-        # boolean array representing where dot > 0.99
-        condition = (d > dot_thresh).reshape(-1,1)
-        
-        # filtered selection where condition is true
-        verts_within_angle = verts[condition.repeat(3, axis=1)].reshape(-1,3)
-        v_len_within_angle = v_length[condition]
+        and take the closest point from that list.
 
-        if len(verts_within_angle) == 0:
+        Only octree leaves that can contain such points are searched,
+        nearest first, stopping once no nearer point is possible.
+        """
+        if not self.ptc_loaded or self.numparts == 0:
             return None
 
-        # sort verts within angle based on ordering of distance to ray origin
-        sort_order = v_len_within_angle.argsort()
-        ordered_verts = verts_within_angle[sort_order]
-        
-        l = ordered_verts[0].tolist()
-        
-        return Vector3(*l)
+        angle = math.radians(1)  # 1 degree angle
+        dot_thresh = math.cos(angle)
+        verts = self.verts.reshape(-1,3)
+        octree = self.frame_data.octree
+        self.charge_frame()
+        origin = np.array(ray.p[:])
+        direction = np.array(ray.v[:])
+
+        best = None
+        best_dist = np.inf
+        leaves, near = octree.cone_leaves(origin, direction, angle)
+        for leaf, leaf_near in zip(leaves, near):
+            if leaf_near >= best_dist:
+                break
+
+            first = octree.first[leaf]
+            i, dist = picker.nearest(verts, origin, direction, dot_thresh,
+                                     octree.order[first:first+octree.count[leaf]])
+            if dist < best_dist:
+                best, best_dist = i, dist
+
+        if best is None:
+            return None
+        return Vector3(*verts[best].tolist())
 
     def draw(self, time=0, camera=None):
         if not self.visible.value or not self.ptc_loaded:
             return
 
+        if self.compact.value != self.compact_layout or self.uses_octree() != self.octree_layout:
+            self.update_buffers()
+        if self.upload_chunk > 0:
+            self.upload_buffers()
+
         glEnable(GL_BLEND)
         glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
 
         # bind glsl uniforms
         glPointSize(self.ptsize.value)
-        self.shader.bind()
-        self.shader.uniformf('gamma', self.gamma.value)
-        self.shader.uniformf('exposure', self.exposure.value)
-        self.shader.uniformf('hueoffset', self.hueoffset.value)
-        self.shader.uniformf('decimate', self.decimate.value)
-        self.shader.uniform_matrixf('modelview', camera.matrixinv * self.matrix())
-        self.shader.uniform_matrixf('projection', camera.persp_matrix)
-        
-        # bind and draw vertex buffers
-        glEnableClientState(GL_VERTEX_ARRAY)
-        glBindBuffer(GL_ARRAY_BUFFER, self.vbo_vert_id)
-        glVertexPointer(3, GL_FLOAT, 0, 0)
+        compact = self.vbo_verts.layout is not None and self.vbo_verts.layout.names is not None
+        shader = self.compact_shader if compact else self.shader
+        shader.bind()
+        shader.uniformf('gamma', self.gamma.value)
+        shader.uniformf('exposure', self.exposure.value)
+        shader.uniformf('hueoffset', self.hueoffset.value)
+        shader.uniform_matrixf('modelview', camera.matrixinv * self.matrix())
+        shader.uniform_matrixf('projection', camera.persp_matrix)
+
+        if compact:
+            self.draw_compact(camera)
+        else:
+            # bind and draw vertex buffers
+            glEnableClientState(GL_VERTEX_ARRAY)
+            glBindBuffer(GL_ARRAY_BUFFER, self.vbo_verts.id)
+            glVertexPointer(3, GL_FLOAT, 0, 0)
 
-        glEnableClientState(GL_COLOR_ARRAY)
-        glBindBuffer(GL_ARRAY_BUFFER, self.vbo_col_id)
-        glColorPointer(3, GL_FLOAT, 0, 0)
+            # buffers may still hold the previous frame while a new one uploads
+            numparts = self.vbo_verts.count // 3
+            if self.vbo_cols.count >= numparts*3:
+                glEnableClientState(GL_COLOR_ARRAY)
+                glBindBuffer(GL_ARRAY_BUFFER, self.vbo_cols.id)
+                glColorPointer(3, GL_FLOAT, 0, 0)
 
-        glDrawArrays( GL_POINTS, 0, self.numparts )
+            self.draw_points(numparts, camera)
 
-        glDisableClientState(GL_VERTEX_ARRAY)
-        glDisableClientState(GL_COLOR_ARRAY)
+            glDisableClientState(GL_VERTEX_ARRAY)
+            glDisableClientState(GL_COLOR_ARRAY)
 
-        self.shader.unbind()
+        shader.unbind()
 
         glDisable(GL_BLEND)
\ No newline at end of file
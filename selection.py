@@ -0,0 +1,133 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import numpy as np
+from octree import matrix_array
+
+# points projected per chunk, limiting temporary arrays
+chunk_size = 1024*1024
+
+def screen_positions(verts, mvp, width, height):
+    ''' Window coordinates (n,2) of points through a euclid projection *
+    modelview matrix. Points behind the camera are nan '''
+    m = matrix_array(mvp).astype(np.float32)
+    v = verts.reshape(-1,3)
+    screen = np.empty((len(v), 2), dtype=np.float32)
+
+    for start in xrange(0, len(v), chunk_size):
+        clip = np.dot(v[start:start+chunk_size], m[:,:3].T)
+        clip += m[:,3]
+        w = clip[:,3]
+        w[w <= 0] = np.nan
+
+        out = screen[start:start+chunk_size]
+        np.divide(clip[:,0], w, out=out[:,0])
+        np.divide(clip[:,1], w, out=out[:,1])
+    screen += 1
+    screen *= (0.5*width, 0.5*height)
+    return screen
+
+def box_mask(screen, x0, y0, x1, y1):
+    ''' Points within a screen rectangle '''
+    x0, x1 = min(x0, x1), max(x0, x1)
+    y0, y1 = min(y0, y1), max(y0, y1)
+    x, y = screen[:,0], screen[:,1]
+    return (x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)
+
+def lasso_mask(screen, polygon):
+    ''' Points within a screen polygon [(x,y), ...]. The polygon is
+    rasterised over its bounds by even-odd crossings, then each point looks
+    up its pixel, so the cost per point doesn't depend on the polygon '''
+    poly = np.array(polygon, dtype=np.float64).reshape(-1,2)
+    mask = np.zeros(len(screen), dtype=bool)
+    if len(poly) < 3:
+        return mask
+
+    x0, y0 = np.floor(poly.min(0))
+    width, height = (np.ceil(poly.max(0)) - (x0, y0)).astype(int)
+    if width <= 0 or height <= 0:
+        return mask
+
+    # for each edge and pixel row it spans, count a crossing at its x position,
+    # a pixel is inside if there's an odd number of crossings to its right
+    crossings = np.zeros((height, width+1), dtype=np.int32)
+    for (ax, ay), (bx, by) in zip(poly, np.roll(poly, -1, axis=0)):
+        if ay == by:
+            continue
+        rows = np.arange(int(np.ceil(min(ay, by) - y0 - 0.5)), int(np.ceil(max(ay, by) - y0 - 0.5)))
+        rows = rows[(rows >= 0) & (rows < height)]
+        cy = rows + y0 + 0.5
+        cx = ax + (cy - ay) * ((bx - ax) / (by - ay))
+        cols = np.clip(np.ceil(cx - x0 - 0.5), 0, width).astype(int)
+        np.add.at(crossings, (rows, cols), 1)
+    inside = (np.cumsum(crossings[:,::-1], axis=1)[:,::-1][:,1:] & 1).astype(bool)
+
+    # look up the pixel of points within the bounds
+    candidates = np.flatnonzero(box_mask(screen, x0, y0, x0 + width, y0 + height))
+    ix = np.minimum((screen[candidates,0] - x0).astype(int), width-1)
+    iy = np.minimum((screen[candidates,1] - y0).astype(int), height-1)
+    mask[candidates] = inside[iy, ix]
+    return mask
+
+def selection_stats(verts, mask, attr=None):
+    ''' Count, bbox and attribute min/max of the selected points '''
+    count = int(np.count_nonzero(mask))
+    if count == 0:
+        return {'count': 0}
+
+    idx = np.flatnonzero(mask)
+    v = verts.reshape(-1,3)[idx]
+    stats = {'count': count, 'bbmin': v.min(0), 'bbmax': v.max(0)}
+    if attr is not None:
+        a = attr.data.reshape(-1, attr.count)[idx]
+        stats['attr'] = attr.name
+        stats['min'] = a.min(0)
+        stats['max'] = a.max(0)
+    return stats
+
+
+if __name__ == '__main__':
+    # timing on random points, eg. python selection.py 10000000
+    import sys
+    import time
+    import math
+    from euclid import Matrix4
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000
+    verts = np.random.rand(n*3).astype(np.float32) * 10
+    mvp = Matrix4.new_perspective(math.radians(50), 2.0, 0.1, 1000) * Matrix4.new_translate(5,5,30).inverse()
+
+    t = time.time()
+    screen = screen_positions(verts, mvp, 1024, 512)
+    print 'project %.3fs' % (time.time() - t)
+
+    t = time.time()
+    mask = box_mask(screen, 400, 200, 600, 300)
+    print 'box %.3fs, %d points' % (time.time() - t, mask.sum())
+
+    circle = [(512 + 100*math.cos(a), 256 + 100*math.sin(a)) for a in np.linspace(0, 2*math.pi, 64, endpoint=False)]
+    t = time.time()
+    mask = lasso_mask(screen, circle)
+    print 'lasso %.3fs, %d points' % (time.time() - t, mask.sum())
@@ -0,0 +1,230 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+"""
+Statistics of an attribute over a whole frame range, to find frames that
+stand out (exploding values, NaNs) without scrubbing through them.
+
+Frames are read and summarised in a process pool, each worker reading the
+files with the viewer's readers rather than through its frame cache, and results
+are collected as they arrive so they can be shown while the job runs.
+"""
+
+import os
+import threading
+import multiprocessing
+import numpy as np
+
+import pdbio
+import stats
+
+# histogram bins of each frame, finer than the merged histogram so
+# re-binning them onto the sequence's range loses little
+frame_bins = 256
+
+# frames whose min or max is further than this from the median of all
+# frames are outliers, in units of the larger of the median absolute
+# deviation of those and the median standard deviation within a frame
+outlier_distance = 8.0
+
+
+def read_attribute_file(filename, attr_name):
+    ''' Values of an attribute as a float32 (n, count) array, or None '''
+    # with the viewer's readers, imported here as ptc imports this module
+    from ptc import read_ptc_file, read_attribute
+
+    # .pdb.gz frames are read streaming, not through the viewer's disk cache,
+    # whose locks a forked worker may have inherited held by another thread
+    if filename.endswith('.pdb.gz'):
+        ptc = pdbio.PdbFile(filename)
+    else:
+        ptc = read_ptc_file(filename)
+    if ptc is None:
+        return None
+
+    for i in range(ptc.numAttributes()):
+        attr = ptc.attributeInfo(i)
+        if attr.name == attr_name:
+            return read_attribute(ptc, attr, ptc.numParticles()).reshape(-1, attr.count)
+    return None
+
+def frame_stats(job):
+    ''' Summary of an attribute in one frame, run in pool processes.
+    job is (frame, filename, attr_name). Non finite values are counted and
+    left out of the rest. Any error gives a None result, an exception would
+    never reach the pool's callback and the frame would never arrive '''
+    frame, filename, attr_name = job
+    try:
+        return frame, summarise(read_attribute_file(filename, attr_name))
+    except Exception:
+        return frame, None
+
+def summarise(a):
+    ''' Summary of a (n, count) attribute array for frame_stats '''
+    if a is None:
+        return None
+
+    finite = np.isfinite(a).all(axis=1)
+    nonfinite = len(a) - int(np.count_nonzero(finite))
+    if nonfinite > 0:
+        a = a[finite]
+
+    result = {'numparts': len(a) + nonfinite, 'nonfinite': nonfinite, 'n': len(a)}
+    if len(a) > 0:
+        s = stats.attribute_stats(a.ravel(), a.shape[1], bins=frame_bins)
+        result.update({'min': s.min.astype(np.float64), 'max': s.max.astype(np.float64),
+                       'mean': s.mean, 'var': s.var, 'lo': s.lo, 'hi': s.hi, 'hist': s.hist})
+    return result
+
+def init_worker():
+    # threads don't survive fork, the stats pool must be made again.
+    # frames are already spread over processes, so use just the one
+    stats._pool = None
+    stats.threads = 1
+
+
+def rebin(hist, lo, hi, new_lo, new_hi, bins):
+    ''' Add each bin of a histogram over lo..hi to the new bin its centre falls in '''
+    centres = lo + (np.arange(len(hist)) + 0.5) * ((hi - lo) / len(hist))
+    width = new_hi - new_lo
+    if width > 0:
+        idx = ((centres - new_lo) * (bins / width)).astype(int)
+    else:
+        idx = np.zeros(len(hist), dtype=int)
+    return np.bincount(np.clip(idx, 0, bins-1), weights=hist, minlength=bins)
+
+
+class SequenceStats(object):
+    ''' An attribute's statistics over a range of frames.
+
+    start() queues every frame on a process pool; poll() collects the
+    frames finished since the last call. Per frame results are kept in
+    frames, and merged() combines those done so far.
+    '''
+
+    def __init__(self, processes=None):
+        self.processes = processes or multiprocessing.cpu_count()
+        self.pool = None
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.attr_name = None
+        self.total = 0
+        self.frames = {}
+        self.arrived = []
+
+    def start(self, filenames, attr_name):
+        ''' Summarise attr_name in filenames, a dict of {frame: filename} '''
+        self.cancel()
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(self.processes, init_worker)
+
+        with self.lock:
+            self.generation += 1
+            generation = self.generation
+            self.attr_name = attr_name
+            self.frames = {}
+            self.arrived = []
+
+        jobs = [ (f, filename, attr_name) for f, filename in sorted(filenames.items()) \
+                 if os.path.exists(filename) ]
+        self.total = len(jobs)
+
+        def arrive(result):
+            # on the pool's result thread
+            with self.lock:
+                if generation == self.generation:
+                    self.arrived.append(result)
+
+        for job in jobs:
+            self.pool.apply_async(frame_stats, (job,), callback=arrive)
+
+    def cancel(self):
+        ''' Drop the frames still to do, by replacing the pool '''
+        with self.lock:
+            self.generation += 1
+            running = len(self.frames) + len(self.arrived) < self.total
+            self.total = 0
+            self.frames = {}
+            self.arrived = []
+        if running and self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+
+    @property
+    def done(self):
+        return len(self.frames) >= self.total
+
+    def poll(self):
+        ''' Frames that have arrived since the last poll '''
+        with self.lock:
+            arrived, self.arrived = self.arrived, []
+        for frame, result in arrived:
+            self.frames[frame] = result
+        return [frame for frame, result in arrived]
+
+    def valid_frames(self):
+        return sorted(f for f, r in self.frames.items() if r is not None and r['n'] > 0)
+
+    def merged(self, bins=64):
+        ''' Min, max, mean, variance and histogram over all frames summarised so far '''
+        frames = self.valid_frames()
+        if len(frames) == 0:
+            return None
+        results = [ self.frames[f] for f in frames ]
+
+        lo, hi, n, mean, m2 = stats._merge_moments([ (r['min'], r['max'], r['n'], r['mean'], r['var'] * r['n']) \
+                                                     for r in results ])
+        hist = np.zeros((len(lo), bins))
+        for r in results:
+            for c in range(len(lo)):
+                hist[c] += rebin(r['hist'][c], r['lo'][c], r['hi'][c], lo[c], hi[c], bins)
+
+        return {'frames': len(frames), 'n': n, 'min': lo, 'max': hi, 'mean': mean, 'var': m2 / n,
+                'lo': lo, 'hi': hi, 'hist': hist,
+                'nonfinite': sum(r['nonfinite'] for r in self.frames.values() if r is not None) }
+
+    def peaks(self):
+        ''' Frames and the largest absolute value of each column in them, for a timeline '''
+        frames = self.valid_frames()
+        peak = np.array([ np.maximum(np.abs(self.frames[f]['min']), np.abs(self.frames[f]['max'])) \
+                          for f in frames ]).reshape(len(frames), -1)
+        return np.array(frames), peak
+
+    def outliers(self):
+        ''' Frames with non finite values, or whose min or max of any column
+        is far from that of most frames '''
+        found = set(f for f, r in self.frames.items() if r is not None and r['nonfinite'] > 0)
+
+        frames = self.valid_frames()
+        if len(frames) >= 3:
+            spread = np.median([ np.sqrt(self.frames[f]['var']) for f in frames ], axis=0)
+            for key in ('min', 'max'):
+                values = np.array([ self.frames[f][key] for f in frames ])
+                median = np.median(values, axis=0)
+                mad = np.median(np.abs(values - median), axis=0)
+                scale = np.maximum(np.maximum(mad, spread), 1e-12)
+                far = (np.abs(values - median) / scale > outlier_distance).any(axis=1)
+                found.update(np.array(frames)[far].tolist())
+        return sorted(found)
@@ -0,0 +1,123 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import os
+import re
+
+# name.0001.ext or name.####.ext
+frame_re = re.compile(r'^(.+\.)([0-9]+|#+)(\..+)$')
+
+# directory listings, keyed by path, with the directory's mtime when listed
+listing_cache = {}
+
+def list_directory(dirname):
+    ''' Names of files in a directory, re-listed only when the directory changes '''
+    mtime = os.stat(dirname).st_mtime
+    cached = listing_cache.get(dirname)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    names = os.listdir(dirname)
+    listing_cache[dirname] = (mtime, names)
+    return names
+
+
+class Sequence(object):
+    ''' Frame numbered files sharing a name, eg. name.0001.pdb ... name.0240.pdb '''
+
+    def __init__(self, dirname, prefix, suffix, padding, frames):
+        self.dirname = dirname
+        self.prefix = prefix
+        self.suffix = suffix
+        self.padding = padding
+        self.frames = sorted(frames)
+
+    @property
+    def pattern(self):
+        ''' Path with the frame number replaced by #s, see object3d.filename_frame '''
+        return os.path.join(self.dirname, self.prefix + '#'*self.padding + self.suffix)
+
+    @property
+    def first(self):
+        return self.frames[0]
+
+    @property
+    def last(self):
+        return self.frames[-1]
+
+    def filename(self, frame):
+        return os.path.join(self.dirname, '%s%0*d%s' % (self.prefix, self.padding, frame, self.suffix))
+
+    def gaps(self):
+        ''' Frames missing between the first and last frame '''
+        present = set(self.frames)
+        return [f for f in range(self.first, self.last+1) if f not in present]
+
+    def contiguous_range(self, start=None):
+        ''' First and last frame of the unbroken run of frames from start '''
+        present = set(self.frames)
+        if start is None or start not in present:
+            start = self.first
+        end = start
+        while end+1 in present:
+            end += 1
+        return start, end
+
+
+def split_filename(filename):
+    ''' Split a frame numbered path into (dirname, prefix, frame string, suffix) '''
+    dirname, basename = os.path.split(filename)
+    m = frame_re.match(basename)
+    if m is None:
+        return None
+    return (dirname,) + m.groups()
+
+def find_sequence(filename):
+    ''' Find the sequence a frame numbered (or #-patterned) filename belongs to,
+    from a single listing of its directory. Returns None if no frames exist '''
+    parts = split_filename(filename)
+    if parts is None:
+        return None
+    dirname, prefix, framestr, suffix = parts
+
+    digits = []
+    for name in list_directory(dirname or os.curdir):
+        if len(name) > len(prefix) + len(suffix) and name.startswith(prefix) and name.endswith(suffix):
+            d = name[len(prefix):len(name)-len(suffix)]
+            if d.isdigit():
+                digits.append(d)
+
+    # padding from the #s, or from zero padded frame numbers if there are any
+    if framestr[0] == '#':
+        padding = len(framestr)
+    else:
+        padded = [d for d in digits if len(d) > 1 and d[0] == '0']
+        padding = len(padded[0]) if len(padded) > 0 else 1
+
+    found = [int(d) for d in digits if '%0*d' % (padding, int(d)) == d]
+    if len(found) == 0:
+        return None
+
+    return Sequence(dirname, prefix, suffix, padding, found)
@@ -0,0 +1,219 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+"""
+Per column statistics of attribute arrays: min, max, mean, variance and a
+fixed bin histogram, computed together chunk by chunk.
+
+Chunks are small enough to stay in cache and are the only temporaries, so
+memory mapped data is read once, in order. When the value ranges are
+already known (eg. from the frame index) everything is done in a single
+pass, otherwise a first pass finds the ranges and moments and a second
+fills the histograms. Chunks are spread over a thread pool, numpy releases
+the GIL for the work inside each one.
+
+StatsWorker runs these off the main thread, so they don't hold up drawing.
+"""
+
+import threading
+import numpy as np
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
+
+# particles per chunk
+chunk_size = 256*1024
+threads = min(4, cpu_count())
+
+_pool = None
+
+def pool():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPool(threads)
+    return _pool
+
+
+class AttributeStats(object):
+    ''' Statistics of each column of an attribute. hist is (columns, bins),
+    with bin edges from lo to hi of each column, like np.histogram '''
+
+    def __init__(self, count, bins):
+        self.count = count
+        self.bins = bins
+        self.n = 0
+        self.min = None
+        self.max = None
+        self.mean = None
+        self.var = None
+        self.hist = None
+        self.lo = None
+        self.hi = None
+
+    def edges(self, column):
+        return np.linspace(self.lo[column], self.hi[column], self.bins+1)
+
+
+def _columns(a):
+    ''' A chunk as contiguous rows of each column, numpy reduces those much
+    faster than strided columns '''
+    return np.ascontiguousarray(a.T)
+
+def _moments(c):
+    ''' min, max, count, mean and sum of squared differences of each column of a chunk '''
+    mean = c.mean(axis=1, dtype=np.float64)
+    # differences in float64, integer attributes would otherwise truncate the mean
+    # and overflow when squared
+    d = c.astype(np.float64) - mean.reshape(-1,1)
+    d *= d
+    return c.min(axis=1), c.max(axis=1), c.shape[1], mean, d.sum(axis=1, dtype=np.float64)
+
+def _merge_moments(results):
+    ''' Combine per chunk moments (Chan et al.'s parallel variance) '''
+    lo, hi, n, mean, m2 = results[0]
+    for clo, chi, cn, cmean, cm2 in results[1:]:
+        lo = np.minimum(lo, clo)
+        hi = np.maximum(hi, chi)
+        total = n + cn
+        delta = cmean - mean
+        mean = mean + delta * (float(cn) / total)
+        m2 = m2 + cm2 + delta**2 * (float(n) * cn / total)
+        n = total
+    return lo, hi, n, mean, m2
+
+def _histogram(c, lo, hi, bins):
+    ''' Histogram counts of each column of a chunk, (columns, bins) '''
+    columns = c.shape[0]
+    width = hi - lo
+    scale = np.where(width > 0, bins / np.where(width > 0, width, 1), 0)
+    idx = ((c - lo.astype(np.float32).reshape(-1,1)) * scale.astype(np.float32).reshape(-1,1)).astype(np.int32)
+    np.clip(idx, 0, bins-1, out=idx)
+    idx += (np.arange(columns, dtype=np.int32) * bins).reshape(-1,1)  # separate range of bins for each column
+    return np.bincount(idx.ravel(), minlength=columns*bins).reshape(columns, bins)
+
+def attribute_stats(data, count, bins=64, ranges=None, cancelled=None):
+    ''' AttributeStats of a flat attribute array with count values per particle.
+    ranges is the known (min, max) of each column, or None. If cancelled()
+    becomes True, remaining chunks are skipped and None is returned '''
+    a = data.reshape(-1, count)
+    stats = AttributeStats(count, bins)
+    if len(a) == 0:
+        return stats
+
+    chunks = [ a[i:i+chunk_size] for i in xrange(0, len(a), chunk_size) ]
+    run = pool().map if len(chunks) > 1 and threads > 1 else map
+    if cancelled is None:
+        cancelled = lambda: False
+
+    def skip(func):
+        return lambda chunk: None if cancelled() else func(chunk)
+
+    if ranges is not None:
+        lo = np.array([r[0] for r in ranges], dtype=np.float64)
+        hi = np.array([r[1] for r in ranges], dtype=np.float64)
+        def both(chunk):
+            c = _columns(chunk)
+            return _moments(c), _histogram(c, lo, hi, bins)
+        results = run(skip(both), chunks)
+        if cancelled(): return None
+        moments = _merge_moments([r[0] for r in results])
+        hist = sum(r[1] for r in results)
+    else:
+        results = run(skip(lambda chunk: _moments(_columns(chunk))), chunks)
+        if cancelled(): return None
+        moments = _merge_moments(results)
+        lo, hi = moments[0].astype(np.float64), moments[1].astype(np.float64)
+        results = run(skip(lambda chunk: _histogram(_columns(chunk), lo, hi, bins)), chunks)
+        if cancelled(): return None
+        hist = sum(results)
+
+    stats.min, stats.max, stats.n, stats.mean, m2 = moments
+    stats.var = m2 / stats.n
+    stats.hist = hist
+    stats.lo, stats.hi = lo, hi
+    return stats
+
+
+class StatsWorker(object):
+    ''' Runs statistics jobs one at a time on a background thread.
+
+    job(cancelled) is called on the worker thread, and should give up
+    when cancelled() becomes True. Submitting a job cancels the previous
+    one, so only the latest result is ever seen, collected by polling
+    from the main thread.
+    '''
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.job = None
+        self.generation = 0
+        self.pending = False
+        self.result = None
+
+        t = threading.Thread(target=self.worker)
+        t.daemon = True
+        t.start()
+
+    def worker(self):
+        while True:
+            with self.cond:
+                while self.job is None:
+                    self.cond.wait()
+                job, generation = self.job, self.generation
+                self.job = None
+
+            cancelled = lambda: self.generation != generation
+            try:
+                result = job(cancelled)
+            except Exception:
+                result = None
+
+            with self.cond:
+                if not cancelled():
+                    self.result = result
+                    self.pending = False
+
+    def submit(self, job):
+        with self.cond:
+            self.generation += 1
+            self.job = job
+            self.pending = True
+            self.result = None
+            self.cond.notify()
+
+    def cancel(self):
+        with self.cond:
+            self.generation += 1
+            self.job = None
+            self.pending = False
+            self.result = None
+
+    def poll(self):
+        ''' (finished, result) of the latest job. Once finished the result
+        is handed over and further polls return (True, None) '''
+        with self.cond:
+            if self.pending:
+                return False, None
+            result, self.result = self.result, None
+            return True, result
@@ -0,0 +1,93 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import unittest
+import numpy as np
+
+from cache import LRUCache, format_bytes
+
+class LRUCacheTest(unittest.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(300)
+        for key in 'abc':
+            cache.put(key, np.zeros(100, np.uint8))
+        cache.get('a')
+        cache.put('d', np.zeros(100, np.uint8))
+        self.assertEqual(sorted(cache.items.keys()), ['a', 'c', 'd'])
+        self.assertEqual(cache.size, 300)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_peek_keeps_age(self):
+        cache = LRUCache(200)
+        cache.put('a', np.zeros(100, np.uint8))
+        cache.put('b', np.zeros(100, np.uint8))
+        self.assertTrue(cache.peek('a') is not None)
+        cache.put('c', np.zeros(100, np.uint8))
+        self.assertFalse('a' in cache)
+        self.assertEqual((cache.hits, cache.misses), (0, 0))
+
+    def test_replace_and_oversized(self):
+        cache = LRUCache(100)
+        cache.put('a', np.zeros(40, np.uint8))
+        cache.put('a', np.zeros(60, np.uint8))
+        self.assertEqual(cache.size, 60)
+        cache.put('b', np.zeros(101, np.uint8))
+        self.assertFalse('b' in cache)
+        self.assertEqual(cache.size, 60)
+
+    def test_budget(self):
+        cache = LRUCache(300)
+        for key in 'abc':
+            cache.put(key, np.zeros(100, np.uint8))
+        cache.set_budget(150)
+        self.assertEqual(list(cache.items.keys()), ['c'])
+        cache.clear()
+        self.assertEqual((len(cache), cache.size), (0, 0))
+
+    def test_resize(self):
+        class Grows(object):
+            nbytes = 10
+        cache = LRUCache(100)
+        value = Grows()
+        cache.put('a', value)
+        cache.put('b', np.zeros(50, np.uint8))
+        value.nbytes = 40
+        cache.resize('a')
+        self.assertEqual(cache.size, 90)
+        # growing past the budget evicts, oldest first
+        value.nbytes = 60
+        cache.resize('a')
+        self.assertEqual(list(cache.items.keys()), ['b'])
+        self.assertEqual(cache.size, 50)
+
+    def test_format_bytes(self):
+        self.assertEqual(format_bytes(512), '512B')
+        self.assertEqual(format_bytes(1536), '1.5KB')
+        self.assertEqual(format_bytes(3 * 1024**3), '3.0GB')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import os
+import gzip
+import time
+import shutil
+import tempfile
+import unittest
+
+from diskcache import DiskCache, gunzip
+
+class DiskCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.dir, 'cache')
+        self.built = []
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def source(self, name, data):
+        filename = os.path.join(self.dir, name)
+        with open(filename, 'wb') as f:
+            f.write(data)
+        return filename
+
+    def build(self, src, dst):
+        self.built.append(src)
+        with open(src, 'rb') as f:
+            data = f.read()
+        with open(dst, 'wb') as f:
+            f.write(data.upper())
+
+    def read(self, filename):
+        with open(filename, 'rb') as f:
+            return f.read()
+
+    def test_built_once(self):
+        cache = DiskCache(self.cache_dir, self.build, 1000)
+        src = self.source('a', 'abc')
+        self.assertEqual(self.read(cache.get(src)), 'ABC')
+        self.assertEqual(cache.get(src), cache.get(src))
+        self.assertEqual(self.built, [src])
+
+        # and by a later session
+        DiskCache(self.cache_dir, self.build, 1000).get(src)
+        self.assertEqual(self.built, [src])
+
+    def test_rebuilt_when_source_changes(self):
+        cache = DiskCache(self.cache_dir, self.build, 1000)
+        src = self.source('a', 'abc')
+        cache.get(src)
+        self.source('a', 'abcd')
+        self.assertEqual(self.read(cache.get(src)), 'ABCD')
+        self.assertEqual(len(self.built), 2)
+
+    def test_evicts_least_recently_used(self):
+        cache = DiskCache(self.cache_dir, self.build, 250)
+        a, b, c = [ self.source(name, 'x' * 100) for name in 'abc' ]
+        path_a = cache.get(a)
+        path_b = cache.get(b)
+        # a used more recently than b
+        os.utime(path_b, (time.time() - 100,) * 2)
+        cache.get(a)
+        path_c = cache.get(c)
+        self.assertEqual([os.path.exists(p) for p in (path_a, path_b, path_c)], [True, False, True])
+
+    def test_failed_builds_leave_nothing(self):
+        def fail(src, dst):
+            with open(dst, 'wb') as f:
+                f.write('partial')
+            raise IOError('failed')
+        cache = DiskCache(self.cache_dir, fail, 1000)
+        self.assertRaises(IOError, cache.get, self.source('a', 'abc'))
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_gunzip(self):
+        src = os.path.join(self.dir, 'a.gz')
+        f = gzip.open(src, 'wb')
+        f.write('points' * 1000)
+        f.close()
+        cache = DiskCache(self.cache_dir, gunzip, 1000**2)
+        self.assertEqual(self.read(cache.get(src)), 'points' * 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from frameindex import FrameIndex, index_path
+
+class FrameIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.pattern = os.path.join(self.dir, 'cloud.####.pdb')
+        self.files = []
+        for f in range(1, 4):
+            filename = os.path.join(self.dir, 'cloud.%04d.pdb' % f)
+            with open(filename, 'wb') as fh:
+                fh.write('x' * f)
+            self.files.append(filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_sidecar(self):
+        self.assertEqual(index_path(self.pattern), os.path.join(self.dir, '.cloud.####.pdb.index'))
+
+    def test_saved_between_sessions(self):
+        index = FrameIndex(self.pattern)
+        index.add(self.files[0], {'numparts': 10})
+        index.update(self.files[0], 'histograms', 'Cd:64', [1, 2])
+        self.assertFalse(index.update(self.files[1], 'histograms', 'Cd:64', [1, 2]))
+        index.save()
+
+        info = FrameIndex(self.pattern).get(self.files[0])
+        self.assertEqual(info['numparts'], 10)
+        self.assertEqual(info['histograms'], {'Cd:64': [1, 2]})
+
+    def test_stale_when_file_changes(self):
+        index = FrameIndex(self.pattern)
+        index.add(self.files[0], {'numparts': 10})
+        index.save()
+        with open(self.files[0], 'ab') as f:
+            f.write('more')
+        self.assertTrue(index.get(self.files[0]) is None)
+
+    def test_build(self):
+        described = []
+        def describe(filename):
+            described.append(filename)
+            if filename == self.files[1]:
+                raise IOError('unreadable')
+            return {'size': os.path.getsize(filename)}
+
+        index = FrameIndex(self.pattern)
+        index.add(self.files[0], {'size': 1})
+        index.build(self.files + [os.path.join(self.dir, 'cloud.0009.pdb')], describe)
+        index.building.join(5)
+
+        self.assertEqual(described, self.files[1:])
+        self.assertTrue(index.get(self.files[1]) is None)
+        self.assertEqual(index.get(self.files[2])['size'], 3)
+        # and saved
+        self.assertEqual(FrameIndex(self.pattern).get(self.files[2])['size'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import unittest
+import numpy as np
+
+import pyglet
+pyglet.options['shadow_window'] = False
+from pyglet.gl import *
+
+from glbuffer import StreamBuffer
+
+window = None
+
+def setUpModule():
+    # a hidden window for its GL context, eg. from Mesa's llvmpipe under
+    # Xvfb with LIBGL_ALWAYS_SOFTWARE=1. without one, there's nothing to test
+    global window
+    try:
+        window = pyglet.window.Window(visible=False)
+    except Exception as e:
+        raise unittest.SkipTest('no GL context: %s' % e)
+
+def tearDownModule():
+    if window is not None:
+        window.close()
+
+def values(n, seed=0):
+    return np.random.RandomState(seed).rand(n).astype(np.float32)
+
+class StreamBufferTest(unittest.TestCase):
+
+    def setUp(self):
+        window.switch_to()
+        self.buf = StreamBuffer()
+
+    def tearDown(self):
+        self.buf.delete()
+
+    def upload(self, a, chunk=0):
+        ''' Upload and swap to an array, returning the number of steps taken '''
+        self.buf.upload(a)
+        steps = 1
+        while not self.buf.step(chunk):
+            steps += 1
+        self.buf.swap()
+        return steps
+
+    def test_upload(self):
+        a = values(3000)
+        self.assertEqual(self.upload(a), 1)
+        self.assertEqual(self.buf.count, 3000)
+        self.assertEqual(self.buf.layout, np.float32)
+        np.testing.assert_array_equal(self.buf.read(), a)
+
+    def test_chunked(self):
+        old, a = values(300, 1), values(15000, 2)
+        self.upload(old)
+
+        self.buf.upload(a)
+        self.assertFalse(self.buf.ready)
+        self.assertFalse(self.buf.step(4096))
+        # the old data is drawn until the upload completes
+        self.buf.swap()
+        np.testing.assert_array_equal(self.buf.read(), old)
+
+        steps = 2
+        while not self.buf.step(4096):
+            steps += 1
+        self.assertEqual(steps, int(np.ceil(a.nbytes / 4096.0)))
+        self.assertTrue(self.buf.ready)
+        self.buf.swap()
+        np.testing.assert_array_equal(self.buf.read(), a)
+
+    def test_reuse_and_regrow(self):
+        buf = self.buf
+        headroom = StreamBuffer.headroom
+
+        # fills both buffers, each grown to fit with some headroom
+        self.upload(values(1000))
+        self.upload(values(500))
+        self.assertEqual(buf.capacity, [int(2000 * headroom), int(4000 * headroom)])
+
+        # smaller data reuses a buffer
+        ids = [id.value for id in buf.ids]
+        a = values(800, 3)
+        self.upload(a)
+        self.assertEqual(buf.capacity[1], int(4000 * headroom))
+        np.testing.assert_array_equal(buf.read(), a)
+
+        # and larger data regrows it
+        a = values(2000, 4)
+        self.upload(a)
+        self.assertEqual(buf.capacity[0], int(8000 * headroom))
+        np.testing.assert_array_equal(buf.read(), a)
+        self.assertEqual([id.value for id in buf.ids], ids)
+
+        # including emptying it
+        self.upload(np.empty(0, np.float32))
+        self.assertEqual(buf.count, 0)
+
+    def test_static(self):
+        buf = StreamBuffer(1, GL_ELEMENT_ARRAY_BUFFER, GL_STATIC_DRAW)
+        try:
+            a = np.arange(999, dtype=np.uint32)
+            buf.upload(a)
+            buf.step()
+            buf.swap()
+            self.assertEqual(buf.capacity, [a.nbytes])
+            np.testing.assert_array_equal(buf.read(np.uint32), a)
+        finally:
+            buf.delete()
+
+    def test_swap_without_upload(self):
+        a = values(600, 5)
+        self.upload(a)
+        front = self.buf.id.value
+        # nothing uploaded since the last swap, the back buffer is stale
+        self.buf.step()
+        self.buf.swap()
+        self.assertEqual(self.buf.id.value, front)
+        np.testing.assert_array_equal(self.buf.read(), a)
+
+    def test_partial_update(self):
+        # positions and colours of a frame, then new colours only, as
+        # Ptc.update_buffers(verts=False) does
+        verts, cols = self.buf, StreamBuffer()
+        try:
+            v, c = values(900, 6), values(900, 7)
+            for buf, data in ((verts, v), (cols, c)):
+                buf.upload(data)
+            for buf in (verts, cols):
+                buf.step()
+                buf.swap()
+
+            c = values(900, 8)
+            cols.upload(c)
+            for buf in (verts, cols):
+                buf.step()
+                buf.swap()
+            np.testing.assert_array_equal(verts.read(), v)
+            np.testing.assert_array_equal(cols.read(), c)
+        finally:
+            cols.delete()
+
+    def test_recreated(self):
+        self.upload(values(100))
+        self.buf.delete()
+        self.buf.init()
+        a = values(200, 9)
+        self.upload(a)
+        np.testing.assert_array_equal(self.buf.read(), a)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from stats import attribute_stats
+from frameindex import FrameIndex
+from histcache import HistogramCache, histogram_entry, entry_nbytes
+
+class HistogramCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dir, 'cloud.0001.pdb')
+        with open(self.filename, 'wb') as f:
+            f.write('x' * 100)
+        s = attribute_stats(np.random.RandomState(0).rand(300).astype(np.float32), 3, bins=8)
+        self.entry = histogram_entry(s)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_entry(self):
+        self.assertEqual(len(self.entry['counts']), 3)
+        self.assertEqual([sum(c) for c in self.entry['counts']], [100, 100, 100])
+        self.assertTrue(entry_nbytes(self.entry) > 0)
+
+    def test_keyed_by_attribute_and_bins(self):
+        cache = HistogramCache(1024**2)
+        cache.put(self.filename, 'Cd', 8, self.entry)
+        self.assertEqual(cache.get(self.filename, 'Cd', 8), self.entry)
+        self.assertTrue(cache.get(self.filename, 'Cd', 16) is None)
+        self.assertTrue(cache.get(self.filename, 'velocity', 8) is None)
+        self.assertTrue(cache.get(os.path.join(self.dir, 'missing.pdb'), 'Cd', 8) is None)
+
+    def test_stale_when_file_changes(self):
+        cache = HistogramCache(1024**2)
+        cache.put(self.filename, 'Cd', 8, self.entry)
+        with open(self.filename, 'ab') as f:
+            f.write('more')
+        self.assertTrue(cache.get(self.filename, 'Cd', 8) is None)
+
+    def test_budget(self):
+        cache = HistogramCache(entry_nbytes(self.entry) * 2)
+        for attr in ('a', 'b', 'c'):
+            cache.put(self.filename, attr, 8, self.entry)
+        self.assertTrue(cache.get(self.filename, 'a', 8) is None)
+        self.assertEqual(cache.get(self.filename, 'c', 8), self.entry)
+
+    def test_saved_in_index(self):
+        index = FrameIndex(os.path.join(self.dir, 'cloud.####.pdb'))
+        index.add(self.filename, {'numparts': 100})
+        HistogramCache(1024**2).put(self.filename, 'Cd', 8, self.entry, index)
+        index.save()
+
+        # found by a new session
+        index = FrameIndex(os.path.join(self.dir, 'cloud.####.pdb'))
+        self.assertEqual(HistogramCache(1024**2).get(self.filename, 'Cd', 8, index), self.entry)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from import_raw import readMeshRAW, readMeshRAWArrays, countTokens, parseTrianglesRAW, uniqueRows, \
+    compactMeshRAW
+
+raw_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'trim.raw')
+
+class ReadMeshRAWTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, text):
+        filename = os.path.join(self.dir, 'mesh.raw')
+        with open(filename, 'wb') as f:
+            f.write(text)
+        return filename
+
+    def test_count_tokens(self):
+        lines = ['1 2 3\n', '  \t4   5\n', '\n', '6']
+        self.assertEqual(countTokens(lines).tolist(), [3, 2, 0, 1])
+
+    def test_parse(self):
+        lines = ['0 0 0 1 0 0 0 1 0\n',
+                 'a comment\n',
+                 '1 2\n',
+                 '0 0 1 1 0 1 1 1 1 0 1 1\n',
+                 '0 0 0 1 0 0 x 1 0\n']
+        tris = parseTrianglesRAW(lines)
+        self.assertEqual(tris.shape, (3, 3, 3))
+        np.testing.assert_array_equal(tris[0], [[0,0,0], [1,0,0], [0,1,0]])
+        np.testing.assert_array_equal(tris[1], [[0,0,1], [1,0,1], [1,1,1]])
+        np.testing.assert_array_equal(tris[2], [[0,0,1], [1,1,1], [0,1,1]])
+
+    def test_unique_rows(self):
+        rs = np.random.RandomState(0)
+        verts = rs.randint(0, 5, (1000, 3)).astype(np.float64)
+        verts[0] = (-0.0, 0.0, 0.0)
+        verts[1] = (0.0, 0.0, 0.0)
+        first, inverse = uniqueRows(verts)
+        np.testing.assert_array_equal(verts[first][inverse], verts)
+        self.assertEqual(len(first), len(set(map(tuple, verts[1:]))))
+        self.assertEqual(inverse[0], inverse[1])
+
+    def test_matches_reference_loader(self):
+        # chunks of a few lines, so duplicates are also removed between chunks
+        for chunk_lines in (100, 1024**2):
+            verts, indices = readMeshRAWArrays(raw_path, chunk_lines)
+            ref_verts, ref_faces = readMeshRAW(raw_path)
+            self.assertEqual(len(verts), len(ref_verts))
+            self.assertEqual(indices.dtype, np.int32)
+            np.testing.assert_array_equal(verts[indices], np.array(ref_verts)[np.array(ref_faces)])
+
+    def test_quads_and_junk(self):
+        filename = self.write('0 0 0 1 0 0 0 1 0\n'
+                              'not a triangle\n'
+                              '0 0 0 1 0 0 1 1 0 0 1 0')
+        verts, indices = readMeshRAWArrays(filename, chunk_lines=2)
+        self.assertEqual(len(verts), 4)
+        self.assertEqual(indices.shape, (3, 3))
+
+    def test_empty(self):
+        verts, indices = readMeshRAWArrays(self.write('nothing here\n'))
+        self.assertEqual((verts.shape, indices.shape), ((0, 3), (0, 3)))
+
+
+class CompactMeshRAWTest(unittest.TestCase):
+
+    def test_weld(self):
+        # two triangles sharing an edge, whose copies differ by round off,
+        # one of them either side of a grid line
+        verts = np.array([[0,0,0], [1,0,0], [0,1,0],
+                          [1+4e-6,0,0], [0,1-1e-7,0], [1,1,0],
+                          [0.5,0,0]], dtype=np.float64)
+        verts[[1,3],0] += 0.45e-5
+        indices = np.array([[0,1,2], [3,5,4]], dtype=np.int32)
+        welded, welded_idx = compactMeshRAW(verts, indices, 1e-5)
+        self.assertEqual(len(welded), 4)
+        self.assertEqual(welded_idx.dtype, np.uint16)
+        np.testing.assert_allclose(welded[welded_idx], verts[indices], atol=1e-5)
+
+        # without welding, only the unused vertex goes
+        self.assertEqual(len(compactMeshRAW(verts, indices)[0]), 6)
+
+    def test_degenerate_triangles(self):
+        verts = np.array([[0,0,0], [1,0,0], [0,1,0], [2,0,0], [1e-7,0,0]], dtype=np.float64)
+        indices = np.array([[0,1,2],    # kept
+                            [0,1,1],    # repeated corner
+                            [0,1,3],    # in a line
+                            [0,4,2]],   # collapses when welded
+                           dtype=np.int32)
+        verts, indices = compactMeshRAW(verts, indices, 1e-5)
+        self.assertEqual(indices.tolist(), [[0,1,2]])
+        self.assertEqual(len(verts), 3)
+
+    def test_large_meshes_use_uint32(self):
+        verts = np.random.RandomState(0).rand(70000*3, 3)
+        indices = np.arange(len(verts), dtype=np.int32).reshape(-1, 3)
+        verts, indices = compactMeshRAW(verts, indices)
+        self.assertEqual(indices.dtype, np.uint32)
+
+    def test_trim(self):
+        # trim.raw has no near duplicates or degenerate triangles, so is unchanged
+        verts, indices = readMeshRAWArrays(raw_path)
+        compact, compact_idx = compactMeshRAW(verts, indices, 1e-5)
+        self.assertEqual(len(compact), len(verts))
+        np.testing.assert_array_equal(compact[compact_idx], verts[indices])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+import meshcache
+from meshcache import save_mesh, load_mesh
+
+class MeshCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'mesh')
+        rs = np.random.RandomState(0)
+        self.arrays = {'vertices': rs.rand(100, 3).astype(np.float32),
+                       'normals': rs.rand(100, 3).astype(np.float32),
+                       'indices': rs.randint(0, 100, (50, 3)).astype(np.uint16),
+                       'empty': np.zeros((0, 3), dtype=np.uint32)}
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def check(self, loaded):
+        self.assertEqual(sorted(loaded.keys()), sorted(self.arrays.keys()))
+        for name, a in self.arrays.items():
+            self.assertEqual(loaded[name].dtype, a.dtype)
+            np.testing.assert_array_equal(loaded[name], a)
+
+    def test_round_trip(self):
+        save_mesh(self.path, **self.arrays)
+        loaded = load_mesh(self.path)
+        self.check(loaded)
+        self.assertTrue(isinstance(loaded['vertices'], np.memmap))
+        self.check(load_mesh(self.path, mmap=False))
+
+    def test_other_format(self):
+        save_mesh(self.path, **self.arrays)
+        with open(self.path, 'rb') as f:
+            header = json.loads(f.readline())
+            data = f.read()
+        header['format'] = meshcache.mesh_format - 1
+        with open(self.path, 'wb') as f:
+            f.write(json.dumps(header) + '\n' + data)
+        self.assertRaises(IOError, load_mesh, self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import unittest
+import numpy as np
+
+from meshopt import acmr, tipsify, reorder_vertices, optimize
+
+def grid(n):
+    ''' Triangles of an n x n grid of quads, and its vertex count '''
+    i, j = np.mgrid[0:n, 0:n]
+    v = (i * (n+1) + j).ravel()
+    quads = np.c_[v, v+1, v+n+2, v+n+1]
+    return np.r_[quads[:,[0,1,2]], quads[:,[0,2,3]]].astype(np.int32), (n+1)**2
+
+def triangles(indices):
+    ''' Set of triangles, each as its sorted vertices '''
+    return sorted(map(tuple, np.sort(indices, axis=1).tolist()))
+
+class MeshOptTest(unittest.TestCase):
+
+    def setUp(self):
+        idx, self.nverts = grid(30)
+        self.indices = idx[np.random.RandomState(0).permutation(len(idx))]
+
+    def test_acmr(self):
+        self.assertEqual(acmr(np.array([[0,1,2]])), 3.0)
+        self.assertEqual(acmr(np.array([[0,1,2], [2,1,3]])), 2.0)
+        # 0 is pushed out of a cache of 3 by 3, 4 and 5
+        self.assertEqual(acmr(np.array([[0,1,2], [3,4,5], [0,1,2]]), 3), 3.0)
+        self.assertEqual(acmr(np.array([[0,1,2], [3,4,5], [0,1,2]]), 6), 2.0)
+        self.assertEqual(acmr(np.zeros((0,3), np.int32)), 0.0)
+
+    def test_tipsify(self):
+        optimized = tipsify(self.indices, self.nverts)
+        self.assertEqual(triangles(optimized), triangles(self.indices))
+        self.assertTrue(acmr(self.indices) > 2.0)
+        self.assertTrue(acmr(optimized) < 0.9)
+
+    def test_reorder_vertices(self):
+        nverts = self.nverts + 5   # some unused
+        order, indices = reorder_vertices(self.indices, nverts)
+        self.assertEqual(sorted(order.tolist()), range(nverts))
+        np.testing.assert_array_equal(order[indices], self.indices)
+
+        # numbered by first use, unused last
+        flat = indices.ravel()
+        first = flat[np.sort(np.unique(flat, return_index=True)[1])]
+        self.assertEqual(first.tolist(), range(self.nverts))
+        self.assertEqual(sorted(order[self.nverts:].tolist()), range(self.nverts, nverts))
+
+    def test_optimize(self):
+        verts = np.random.RandomState(1).rand(self.nverts, 3)
+        order, indices, before, after = optimize(self.indices, self.nverts)
+        self.assertTrue(after < before)
+        # the same triangles, as tipsify orders them
+        np.testing.assert_array_equal(verts[order][indices], verts[tipsify(self.indices, self.nverts)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import os
+import math
+import unittest
+import numpy as np
+
+import pyglet
+pyglet.options['shadow_window'] = False
+
+# object3d reads its shader source relative to the repository
+_cwd = os.getcwd()
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from object3d import Object3d
+finally:
+    os.chdir(_cwd)
+
+calculate_normals = Object3d.calculate_normals
+
+def reference_normals(verts, idx, weighting=None):
+    ''' Each vertex's faces summed one at a time, like the original O(V*F) version '''
+    verts = np.asarray(verts, dtype=np.float64)
+    vn = np.zeros((len(verts), 3))
+    for v in range(len(verts)):
+        for face in idx:
+            if v not in face:
+                continue
+            p0, p1, p2 = verts[face]
+            n = np.cross(p1 - p0, p2 - p0)
+            if weighting != 'area':
+                length = np.sqrt((n**2).sum())
+                n = n / length if length > 0 else n
+            if weighting == 'angle':
+                corner = list(face).index(v)
+                a = verts[face[(corner+1)%3]] - verts[v]
+                b = verts[face[(corner+2)%3]] - verts[v]
+                n = n * math.atan2(np.sqrt((np.cross(a, b)**2).sum()), np.dot(a, b))
+            vn[v] += n
+    length = np.sqrt((vn**2).sum(1)).reshape(-1,1)
+    return vn / np.where(length > 0, length, 1)
+
+def normalized(v):
+    v = np.array(v, dtype=np.float64)
+    return v / np.sqrt((v**2).sum())
+
+class CalculateNormalsTest(unittest.TestCase):
+
+    def setUp(self):
+        # a bumpy, irregular grid
+        rs = np.random.RandomState(0)
+        n = 6
+        i, j = np.mgrid[0:n+1, 0:n+1]
+        self.verts = np.c_[i.ravel() + rs.rand((n+1)**2) * 0.5,
+                           j.ravel() + rs.rand((n+1)**2) * 0.5,
+                           rs.rand((n+1)**2)]
+        v = (i[:-1,:-1] * (n+1) + j[:-1,:-1]).ravel()
+        self.idx = np.r_[np.c_[v, v+n+1, v+n+2], np.c_[v, v+n+2, v+1]]
+
+    def test_matches_reference(self):
+        for weighting in (None, 'area', 'angle'):
+            np.testing.assert_allclose(calculate_normals(self.verts, self.idx, weighting),
+                                       reference_normals(self.verts, self.idx, weighting),
+                                       atol=1e-12)
+
+    def test_weighting(self):
+        # a fan around the origin: a small right angled corner facing +z,
+        # and a larger 45 degree one facing +x
+        verts = np.array([[0,0,0], [1,0,0], [0,1,0], [0,2,0], [0,2,2]], dtype=np.float64)
+        idx = np.array([[0,1,2], [0,3,4]])
+        np.testing.assert_allclose(calculate_normals(verts, idx)[0], normalized([1,0,1]))
+        np.testing.assert_allclose(calculate_normals(verts, idx, 'area')[0], normalized([4,0,1]))
+        np.testing.assert_allclose(calculate_normals(verts, idx, 'angle')[0], normalized([1,0,2]))
+
+    def test_degenerate_faces(self):
+        verts = np.r_[self.verts, [[0,0,5], [1,1,5]]]
+        n = len(self.verts)
+        idx = np.r_[self.idx, [[0, 0, 1], [n, n+1, n+1], [n, n+1, n]]]
+        for weighting in (None, 'area', 'angle'):
+            vn = calculate_normals(verts, idx, weighting)
+            self.assertTrue(np.isfinite(vn).all())
+            np.testing.assert_allclose(vn[:n], calculate_normals(self.verts, self.idx, weighting), atol=1e-12)
+            np.testing.assert_array_equal(vn[n:], 0)
+
+    def test_matrix_input(self):
+        # as returned by transform_verts before it gave arrays
+        vn = calculate_normals(np.matrix(self.verts), self.idx, 'angle')
+        self.assertEqual(vn.shape, self.verts.shape)
+        np.testing.assert_allclose(vn, calculate_normals(self.verts, self.idx, 'angle'))
+
+
+if __name__ == '__main__':
+    unittest.main()
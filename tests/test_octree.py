@@ -0,0 +1,132 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import math
+import unittest
+import numpy as np
+
+from euclid import Matrix4
+from octree import Octree, morton_codes, matrix_array
+
+def cloud(n, seed=0):
+    return np.random.RandomState(seed).rand(n, 3).astype(np.float32) * 2 - 1
+
+class OctreeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.verts = cloud(20000)
+        self.octree = Octree(self.verts.ravel(), (-1,-1,-1), (1,1,1), leaf_size=500)
+
+    def test_morton_codes(self):
+        ijk = np.array([[0,0,0], [1,0,0], [0,1,0], [0,0,1], [1,1,1], [2,0,0]])
+        self.assertEqual(morton_codes(ijk, 2).tolist(), [0, 1, 2, 4, 7, 8])
+
+    def test_leaves_partition_particles(self):
+        octree = self.octree
+        self.assertEqual(octree.depth, 2)
+        self.assertEqual(sorted(octree.order.tolist()), range(len(self.verts)))
+        self.assertEqual(octree.count.sum(), len(self.verts))
+        np.testing.assert_array_equal(octree.first[1:], np.cumsum(octree.count)[:-1])
+        self.assertTrue((np.diff(octree.codes) > 0).all())
+
+    def test_leaf_bounds(self):
+        octree = self.octree
+        for leaf in range(len(octree)):
+            v = self.verts[octree.order[octree.first[leaf]:octree.first[leaf] + octree.count[leaf]]]
+            np.testing.assert_array_equal(octree.bbmin[leaf], v.min(axis=0))
+            np.testing.assert_array_equal(octree.bbmax[leaf], v.max(axis=0))
+            # and within the leaf's cell, a quarter of the box at depth 2
+            self.assertTrue(((octree.bbmax[leaf] - octree.bbmin[leaf]) <= 0.5).all())
+
+    def test_lod_within_budget(self):
+        octree = self.octree
+        # looking down -z at the cloud from 3 units away
+        modelview = Matrix4.new_translate(0, 0, -3)
+        counts = octree.lod_counts(modelview, 1.0, 1000, 5000)
+        self.assertTrue((counts <= octree.count).all())
+        self.assertTrue(5000 - len(octree) <= counts.sum() <= 5000 + len(octree))
+
+        # nearer leaves draw more of their particles
+        fraction = counts / octree.count.astype(float)
+        z = (octree.bbmin[:,2] + octree.bbmax[:,2]) * 0.5
+        self.assertTrue(fraction[z > 0.5].mean() > fraction[z < -0.5].mean())
+
+    def test_lod_under_budget(self):
+        octree = self.octree
+        modelview = Matrix4.new_translate(0, 0, -3)
+        np.testing.assert_array_equal(octree.lod_counts(modelview, 1.0, 1000, 1e6), octree.count)
+
+        visible = np.arange(len(octree)) % 2 == 0
+        counts = octree.lod_counts(modelview, 1.0, 1000, 1e6, visible)
+        np.testing.assert_array_equal(counts, np.where(visible, octree.count, 0))
+
+    def test_visible(self):
+        octree = self.octree
+        projection = Matrix4.new_perspective(math.radians(30), 1.0, 0.1, 100)
+        modelview = Matrix4.new_translate(0, 0, -1.5)
+        visible = octree.visible(projection, modelview)
+        self.assertTrue(0 < visible.sum() < len(octree))
+
+        # no leaf with a point in view is culled
+        v = np.c_[self.verts, np.ones(len(self.verts))]
+        clip = np.dot(v, np.dot(matrix_array(projection), matrix_array(modelview)).T)
+        inside = (np.abs(clip[:,:3]) <= clip[:,3:]).all(axis=1)
+        leaf = np.repeat(np.arange(len(octree)), octree.count)
+        self.assertTrue(visible[leaf[inside[octree.order]]].all())
+
+    def test_behind_camera(self):
+        projection = Matrix4.new_perspective(math.radians(60), 1.0, 0.1, 100)
+        modelview = Matrix4.new_translate(0, 0, 3)
+        self.assertFalse(self.octree.visible(projection, modelview).any())
+
+    def test_cone_leaves(self):
+        octree = self.octree
+        leaf = np.repeat(np.arange(len(octree)), octree.count)[np.argsort(octree.order)]
+        angle = math.radians(5)
+        rs = np.random.RandomState(1)
+        for i in range(10):
+            origin = rs.normal(0, 1, 3) * 3
+            direction = -origin + rs.normal(0, 0.3, 3)
+            direction /= np.sqrt((direction**2).sum())
+            leaves, near = octree.cone_leaves(origin, direction, angle)
+            self.assertTrue((np.diff(near) >= 0).all())
+
+            # every point within the cone is in one of the leaves, no nearer than its leaf
+            v = self.verts - origin
+            dist = np.sqrt((v**2).sum(1))
+            within = np.dot(v, direction) > dist * math.cos(angle)
+            self.assertTrue(np.in1d(leaf[within], leaves).all())
+            near_of = dict(zip(leaves, near))
+            for p in np.flatnonzero(within):
+                self.assertTrue(near_of[leaf[p]] <= dist[p] + 1e-5)
+
+    def test_empty(self):
+        octree = Octree(np.empty(0, np.float32), (0,0,0), (1,1,1))
+        self.assertEqual(len(octree), 0)
+        self.assertEqual(octree.nbytes, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import os
+import gzip
+import shutil
+import struct
+import tempfile
+import unittest
+import numpy as np
+
+import pdbio
+from pdbio import PdbFile, PdbError
+
+# pdb channel types
+PDB_VECTOR, PDB_REAL, PDB_LONG, PDB_POINTERT = 1, 2, 3, 5
+
+def write_pdb(filename, numparts, channels, bits=32, byteorder='<'):
+    ''' Write a pdb file the way partio does, a C struct at a time, with
+    pointers of the given size. channels are (name, type, datasize, array) '''
+    ptr = 'I' if bits == 32 else 'Q'
+    pad = lambda n: '%dx' % n
+    out = []
+
+    # PDB_Header: magic, swap, version, time, data_size, num_data, padding[32], data*,
+    # padded to the 8 byte alignment of the double
+    out.append(struct.pack(byteorder + 'iH2xf4xdII32s' + ptr + (pad(4) if bits == 32 else ''),
+                           670, 1, 1.0, 0.0, numparts, len(channels), '', 0))
+    for name, ctype, datasize, array in channels:
+        # Channel_io_Header: type, size, swap, encoding, binary
+        out.append(struct.pack(byteorder + 'cxHcc', '\0', 0, '\0', '\0'))
+        # Channel: name*, type, size, active_start, active_end, hide, disconnect, data*, link*, next*
+        out.append(struct.pack(byteorder + ptr + 'iIIIcc' + pad(2 if bits == 32 else 6) + ptr*3,
+                               0, ctype, numparts, 0, max(numparts - 1, 0), '\0', '\0', 0, 0, 0))
+        out.append(name + '\0')
+        # Channel_Data: type, datasize, blocksize, num_blocks, block*
+        out.append(struct.pack(byteorder + 'iIIi' + ptr, ctype, datasize, numparts, 1, 0))
+        out.append(np.ascontiguousarray(array).astype(array.dtype.newbyteorder(byteorder)).tostring())
+
+    data = ''.join(out)
+    f = gzip.open(filename, 'wb') if filename.endswith('.gz') else open(filename, 'wb')
+    f.write(data)
+    f.close()
+    return len(data)
+
+
+class PdbFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        rs = np.random.RandomState(0)
+        self.numparts = 50
+        self.position = rs.rand(self.numparts, 3).astype(np.float32)
+        self.radius = rs.rand(self.numparts).astype(np.float32)
+        self.id = np.arange(self.numparts, dtype=np.int32) * 7
+        # a channel type pdbio doesn't read, with 8 bytes per particle
+        self.unknown = rs.randint(0, 255, (self.numparts, 8)).astype(np.uint8)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, name, **kwargs):
+        filename = os.path.join(self.dir, name)
+        channels = [('position', PDB_VECTOR, 12, self.position),
+                    ('ptr', PDB_POINTERT, 8, self.unknown),
+                    ('radius', PDB_REAL, 4, self.radius),
+                    ('id', PDB_LONG, 4, self.id)]
+        write_pdb(filename, self.numparts, channels, **kwargs)
+        return filename
+
+    def check(self, pdb):
+        self.assertEqual(pdb.numParticles(), self.numparts)
+        self.assertEqual([pdb.attributeInfo(i).name for i in range(pdb.numAttributes())],
+                         ['position', 'radius', 'id'])
+        position, radius, id = pdb.attributes
+        self.assertEqual((position.type, position.count), (pdbio.VECTOR, 3))
+        self.assertEqual((radius.type, radius.count), (pdbio.FLOAT, 1))
+        self.assertEqual((id.type, id.count), (pdbio.INT, 1))
+
+        for attr, expected in zip(pdb.attributes, (self.position, self.radius, self.id)):
+            a = pdb.getArray(attr)
+            self.assertTrue(a.dtype.isnative)
+            self.assertEqual(a.dtype.kind, expected.dtype.kind)
+            np.testing.assert_array_equal(a, expected.ravel())
+
+    def test_pdb32(self):
+        self.check(PdbFile(self.write('cloud.0001.pdb')))
+        self.check(PdbFile(self.write('cloud.0001.pdb32')))
+
+    def test_pdb64(self):
+        self.check(PdbFile(self.write('cloud.0001.pdb64', bits=64)))
+
+    def test_big_endian(self):
+        self.check(PdbFile(self.write('cloud.0001.pdb', byteorder='>')))
+        self.check(PdbFile(self.write('cloud.0001.pdb64', bits=64, byteorder='>'), mmap=True))
+
+    def test_gz(self):
+        self.check(PdbFile(self.write('cloud.0001.pdb.gz')))
+        self.check(PdbFile(self.write('cloud.0001.pdb64.gz', bits=64, byteorder='>'), mmap=True))
+
+    def test_mmap(self):
+        pdb = PdbFile(self.write('cloud.0001.pdb'), mmap=True)
+        self.check(pdb)
+        self.assertTrue(isinstance(pdb.getArray(pdb.attributes[0]), np.memmap))
+
+    def test_no_particles(self):
+        filename = os.path.join(self.dir, 'empty.pdb')
+        write_pdb(filename, 0, [('position', PDB_VECTOR, 12, np.zeros((0,3), np.float32))])
+        pdb = PdbFile(filename, mmap=True)
+        self.assertEqual(len(pdb.getArray(pdb.attributes[0])), 0)
+
+    def test_truncated(self):
+        for name in ('cloud.0001.pdb', 'cloud.0001.pdb.gz'):
+            filename = self.write(name)
+            data = pdbio.open_file(filename).read()
+            f = gzip.open(filename, 'wb') if name.endswith('.gz') else open(filename, 'wb')
+            f.write(data[:-10])
+            f.close()
+            self.assertRaises(PdbError, PdbFile, filename)
+
+    def test_corrupt(self):
+        filename = os.path.join(self.dir, 'cloud.0001.pdb')
+        with open(filename, 'wb') as f:
+            f.write('x' * 20000)
+        self.assertRaises(PdbError, PdbFile, filename)
+
+        # half a gzip stream
+        gz = self.write('cloud.0002.pdb.gz')
+        with open(gz, 'rb') as f:
+            data = f.read()
+        with open(gz, 'wb') as f:
+            f.write(data[:len(data)//2])
+        self.assertRaises(PdbError, PdbFile, gz)
+
+    def test_flavours(self):
+        self.assertTrue(pdbio.is_pdb('a.pdb.gz') and pdbio.is_pdb('a.pdb64'))
+        self.assertFalse(pdbio.is_pdb('a.bgeo'))
+        self.assertEqual([pdbio.pointer_bits(f) for f in ('a.pdb', 'a.pdb32', 'a.pdb64.gz')], [32, 32, 64])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import math
+import unittest
+import numpy as np
+
+from pick import ConePicker, intersect_reference
+
+class ConePickerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.verts = np.random.RandomState(0).rand(5000, 3).astype(np.float32) * 10
+        self.origin = np.array([5.0, 5.0, 30.0])
+        direction = np.array([0.02, -0.01, -1.0])
+        self.direction = direction / np.sqrt((direction**2).sum())
+        self.cos_angle = math.cos(math.radians(2))
+
+    def test_matches_reference(self):
+        # chunks smaller than the cloud, with a partial last chunk
+        picker = ConePicker(chunk=700)
+        i, dist = picker.nearest(self.verts, self.origin, self.direction, self.cos_angle)
+        expected = intersect_reference(self.verts, self.origin, self.direction, self.cos_angle)
+        np.testing.assert_array_equal(self.verts[i], expected)
+        self.assertAlmostEqual(dist, np.sqrt(((expected - self.origin)**2).sum()), places=4)
+
+    def test_subset(self):
+        picker = ConePicker(chunk=700)
+        idx = np.arange(1, len(self.verts), 2).astype(np.int32)
+        i, dist = picker.nearest(self.verts, self.origin, self.direction, self.cos_angle, idx)
+        expected = intersect_reference(self.verts[idx], self.origin, self.direction, self.cos_angle)
+        self.assertEqual(i % 2, 1)
+        np.testing.assert_array_equal(self.verts[i], expected)
+
+    def test_miss(self):
+        picker = ConePicker()
+        i, dist = picker.nearest(self.verts, self.origin, -self.direction, self.cos_angle)
+        self.assertTrue(i is None)
+        self.assertEqual(dist, np.inf)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import time
+import unittest
+import threading
+
+from prefetch import Prefetcher, frame_window
+
+class FrameWindowTest(unittest.TestCase):
+
+    def test_forwards_and_backwards(self):
+        self.assertEqual(frame_window(5, 1, 3, 1, 10), [6, 7, 8])
+        self.assertEqual(frame_window(5, -2, 3, 1, 10), [3, 1])
+        self.assertEqual(frame_window(9, 1, 3, 1, 10), [10])
+
+    def test_loop(self):
+        self.assertEqual(frame_window(9, 1, 3, 1, 10, loop=True), [10, 1, 2])
+
+    def test_still(self):
+        self.assertEqual(frame_window(5, 0, 3, 1, 10), [])
+
+
+class PrefetcherTest(unittest.TestCase):
+
+    def wait(self, prefetcher, key):
+        for i in range(500):
+            if prefetcher.ready(key):
+                return
+            time.sleep(0.01)
+        self.fail('%r never loaded' % key)
+
+    def test_loads_scheduled_keys(self):
+        prefetcher = Prefetcher(lambda key: key * 2)
+        prefetcher.schedule([1, 2, 3])
+        for key in (1, 2, 3):
+            self.wait(prefetcher, key)
+        self.assertEqual([ prefetcher.get(k) for k in (1, 2, 3) ], [2, 4, 6])
+        self.assertTrue(prefetcher.get(4) is None)
+
+    def test_ready(self):
+        release = threading.Event()
+        def loader(key):
+            release.wait(5)
+            return key
+        prefetcher = Prefetcher(loader, workers=1)
+        prefetcher.schedule(['a'])
+        self.assertFalse(prefetcher.ready('a'))
+        release.set()
+        self.wait(prefetcher, 'a')
+        self.assertEqual(prefetcher.get('a'), 'a')
+
+    def test_unwanted_results_dropped(self):
+        prefetcher = Prefetcher(lambda key: key)
+        prefetcher.schedule(['a', 'b'])
+        self.wait(prefetcher, 'a')
+        self.wait(prefetcher, 'b')
+        prefetcher.schedule(['b'])
+        self.assertFalse(prefetcher.ready('a'))
+        self.assertEqual(prefetcher.get('b'), 'b')
+
+    def test_loader_errors(self):
+        def loader(key):
+            raise IOError(key)
+        prefetcher = Prefetcher(loader)
+        prefetcher.schedule(['a'])
+        self.wait(prefetcher, 'a')
+        self.assertTrue(prefetcher.get('a') is None)
+
+
+if __name__ == '__main__':
+    unittest.main()
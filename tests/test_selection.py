@@ -0,0 +1,96 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import math
+import unittest
+import numpy as np
+from euclid import Matrix4
+
+import selection
+from selection import screen_positions, box_mask, lasso_mask, selection_stats
+
+def inside_polygon(points, poly):
+    ''' Even-odd test of each point against every edge '''
+    inside = np.zeros(len(points), dtype=bool)
+    x, y = points[:,0], points[:,1]
+    for (ax, ay), (bx, by) in zip(poly, poly[1:] + poly[:1]):
+        spans = (ay > y) != (by > y)
+        cx = ax + (y - ay) * (bx - ax) / np.where(by != ay, by - ay, 1)
+        inside ^= spans & (x < cx)
+    return inside
+
+class Attr(object):
+    def __init__(self, name, count, data):
+        self.name, self.count, self.data = name, count, data
+
+class SelectionTest(unittest.TestCase):
+
+    def test_screen_positions(self):
+        chunk_size = selection.chunk_size
+        selection.chunk_size = 7
+        try:
+            verts = np.array([[0,0,-2], [1,1,-2], [-1,0.5,-4], [0,0,2]], dtype=np.float32)
+            mvp = Matrix4.new_perspective(math.radians(90), 1.0, 0.1, 100)
+            screen = screen_positions(np.tile(verts, (5,1)), mvp, 200, 100)
+        finally:
+            selection.chunk_size = chunk_size
+
+        np.testing.assert_allclose(screen[:3], [[100, 50], [150, 75], [75, 56.25]], rtol=1e-5)
+        # behind the camera
+        self.assertTrue(np.isnan(screen[3]).all())
+        np.testing.assert_array_equal(np.isnan(screen[:,0]), np.tile([False]*3 + [True], 5))
+
+    def test_box(self):
+        screen = np.array([[1,1], [5,5], [10,2], [np.nan,np.nan]], dtype=np.float32)
+        self.assertEqual(box_mask(screen, 6, 0, 0, 6).tolist(), [True, True, False, False])
+
+    def test_lasso(self):
+        # points at pixel centres, the lasso is exact for those
+        rs = np.random.RandomState(0)
+        screen = (rs.randint(0, 200, (5000, 2)) + 0.5).astype(np.float32)
+        star = [ (100 + r*math.cos(a), 100 + r*math.sin(a)) for a, r in
+                 zip(np.linspace(0, 2*math.pi, 10, endpoint=False), [90.25, 30.25]*5) ]
+        mask = lasso_mask(screen, star)
+        self.assertTrue(0 < mask.sum() < len(screen))
+        np.testing.assert_array_equal(mask, inside_polygon(screen, star))
+
+    def test_degenerate_lasso(self):
+        screen = np.zeros((3, 2), dtype=np.float32)
+        self.assertFalse(lasso_mask(screen, [(0,0), (1,1)]).any())
+        self.assertFalse(lasso_mask(screen, [(0,0), (5,0), (9,0)]).any())
+
+    def test_stats(self):
+        verts = np.arange(12, dtype=np.float32)
+        attr = Attr('Cd', 1, np.array([5, 1, 7, 3], dtype=np.float32))
+        stats = selection_stats(verts, np.array([True, False, True, False]), attr)
+        self.assertEqual(stats['count'], 2)
+        np.testing.assert_array_equal(stats['bbmin'], [0, 1, 2])
+        np.testing.assert_array_equal(stats['bbmax'], [6, 7, 8])
+        np.testing.assert_array_equal((stats['min'], stats['max']), ([5], [7]))
+        self.assertEqual(selection_stats(verts, np.zeros(4, bool)), {'count': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
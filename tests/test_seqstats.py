@@ -0,0 +1,140 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import os
+import time
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from seqstats import SequenceStats, summarise
+from tests.test_pdbio import write_pdb, PDB_VECTOR
+
+def viewer_available():
+    ''' SequenceStats reads frames with ptc, which needs pyglet, without a
+    display if there's no shadow window, and its shader source '''
+    cwd = os.getcwd()
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    try:
+        import pyglet
+        pyglet.options['shadow_window'] = False
+        import ptc
+        return True
+    except ImportError:
+        return False
+    finally:
+        os.chdir(cwd)
+
+def sequence(arrays):
+    seq = SequenceStats(processes=1)
+    seq.total = len(arrays)
+    seq.frames = dict((f, summarise(a)) for f, a in enumerate(arrays))
+    return seq
+
+class SummariseTest(unittest.TestCase):
+
+    def test_nonfinite(self):
+        a = np.arange(30, dtype=np.float32).reshape(10, 3)
+        a[2,1] = np.nan
+        a[5,0] = np.inf
+        r = summarise(a)
+        finite = a[[0,1,3,4,6,7,8,9]]
+        self.assertEqual((r['numparts'], r['nonfinite'], r['n']), (10, 2, 8))
+        np.testing.assert_allclose(r['mean'], finite.mean(axis=0))
+        np.testing.assert_allclose(r['var'], finite.var(axis=0))
+
+    def test_missing(self):
+        self.assertTrue(summarise(None) is None)
+
+
+class SequenceStatsTest(unittest.TestCase):
+
+    def test_merged(self):
+        rs = np.random.RandomState(4)
+        arrays = [ rs.normal(f, 1.0 + f, (100 + 10*f, 2)).astype(np.float32) for f in range(5) ]
+        merged = sequence(arrays).merged()
+        a = np.concatenate(arrays)
+        self.assertEqual(merged['n'], len(a))
+        np.testing.assert_allclose(merged['mean'], a.mean(axis=0, dtype=np.float64), rtol=1e-6)
+        np.testing.assert_allclose(merged['var'], a.var(axis=0, dtype=np.float64), rtol=1e-5)
+        np.testing.assert_allclose(merged['hist'].sum(axis=1), len(a))
+
+    def test_outliers(self):
+        rs = np.random.RandomState(5)
+        arrays = [ rs.rand(200, 1).astype(np.float32) for f in range(8) ]
+        arrays[3][7] = 1e6
+        arrays[6][0] = np.nan
+        self.assertEqual(sequence(arrays).outliers(), [3, 6])
+
+    def test_unreadable_frame_arrives(self):
+        # a frame that fails to read is still recorded, so the job finishes
+        tmp = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmp, 'broken.0001.pdb')
+            with open(filename, 'wb') as f:
+                f.write('not a point cloud')
+
+            seq = SequenceStats(processes=1)
+            seq.start({1: filename}, 'Cd')
+            for i in range(1000):
+                seq.poll()
+                if seq.done:
+                    break
+                time.sleep(0.01)
+            seq.pool.terminate()
+            self.assertTrue(seq.done)
+            self.assertEqual(seq.frames, {1: None})
+        finally:
+            shutil.rmtree(tmp)
+
+    @unittest.skipUnless(viewer_available(), 'needs pyglet to import ptc')
+    def test_gz_frames(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            arrays = {}
+            for f in (1, 2, 3):
+                arrays[f] = np.random.RandomState(f).rand(100, 3).astype(np.float32)
+                write_pdb(os.path.join(tmp, 'cloud.%04d.pdb.gz' % f), 100,
+                          [('velocity', PDB_VECTOR, 12, arrays[f])])
+
+            seq = SequenceStats(processes=2)
+            seq.start(dict((f, os.path.join(tmp, 'cloud.%04d.pdb.gz' % f)) for f in arrays), 'velocity')
+            for i in range(1000):
+                seq.poll()
+                if seq.done:
+                    break
+                time.sleep(0.01)
+            seq.pool.terminate()
+
+            self.assertEqual(seq.valid_frames(), [1, 2, 3])
+            a = np.concatenate([arrays[f] for f in (1, 2, 3)])
+            np.testing.assert_allclose(seq.merged()['mean'], a.mean(axis=0), rtol=1e-5)
+        finally:
+            shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    unittest.main()
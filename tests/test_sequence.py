@@ -0,0 +1,78 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from sequence import find_sequence, split_filename
+
+class SequenceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def touch(self, *names):
+        for name in names:
+            open(os.path.join(self.dir, name), 'w').close()
+
+    def test_split(self):
+        self.assertEqual(split_filename('/a/b/cloud.0012.pdb.gz'), ('/a/b', 'cloud.', '0012', '.pdb.gz'))
+        self.assertEqual(split_filename('cloud.####.pdb'), ('', 'cloud.', '####', '.pdb'))
+        self.assertTrue(split_filename('cloud.pdb') is None)
+
+    def test_find(self):
+        self.touch('cloud.0001.pdb', 'cloud.0002.pdb', 'cloud.0005.pdb',
+                   'cloud.12.pdb', 'cloud.0003.bgeo', 'other.0004.pdb')
+        seq = find_sequence(os.path.join(self.dir, 'cloud.0002.pdb'))
+        self.assertEqual(seq.frames, [1, 2, 5])
+        self.assertEqual(seq.pattern, os.path.join(self.dir, 'cloud.####.pdb'))
+        self.assertEqual(seq.filename(7), os.path.join(self.dir, 'cloud.0007.pdb'))
+        self.assertEqual(seq.gaps(), [3, 4])
+        self.assertEqual(seq.contiguous_range(), (1, 2))
+        self.assertEqual(seq.contiguous_range(5), (5, 5))
+
+    def test_find_pattern(self):
+        self.touch('cloud.1.pdb', 'cloud.2.pdb', 'cloud.10.pdb')
+        seq = find_sequence(os.path.join(self.dir, 'cloud.#.pdb'))
+        self.assertEqual(seq.frames, [1, 2, 10])
+        self.assertTrue(find_sequence(os.path.join(self.dir, 'missing.#.pdb')) is None)
+
+    def test_listing_refreshed(self):
+        self.touch('cloud.0001.pdb')
+        filename = os.path.join(self.dir, 'cloud.0001.pdb')
+        self.assertEqual(find_sequence(filename).frames, [1])
+        self.touch('cloud.0002.pdb')
+        # the directory's mtime may not have changed within the same second
+        os.utime(self.dir, (0, os.stat(self.dir).st_mtime + 10))
+        self.assertEqual(find_sequence(filename).frames, [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
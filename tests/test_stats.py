@@ -0,0 +1,111 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2012 Matt Ebb
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import time
+import unittest
+import threading
+import numpy as np
+
+import stats
+from stats import attribute_stats, StatsWorker
+
+class AttributeStatsTest(unittest.TestCase):
+
+    def setUp(self):
+        # small chunks, so results are merged from several of them
+        self.chunk_size = stats.chunk_size
+        stats.chunk_size = 1000
+
+    def tearDown(self):
+        stats.chunk_size = self.chunk_size
+
+    def check(self, a, s):
+        np.testing.assert_array_equal(s.min, a.min(axis=0))
+        np.testing.assert_array_equal(s.max, a.max(axis=0))
+        np.testing.assert_allclose(s.mean, a.mean(axis=0, dtype=np.float64), rtol=1e-9)
+        np.testing.assert_allclose(s.var, a.var(axis=0, dtype=np.float64), rtol=1e-6)
+        self.assertEqual(s.n, len(a))
+
+    def test_float_columns(self):
+        a = np.random.RandomState(1).normal(10.0, 3.0, (5500, 3)).astype(np.float32)
+        s = attribute_stats(a.ravel(), 3)
+        self.check(a, s)
+        for i in range(3):
+            hist, edges = np.histogram(a[:,i], s.bins, (s.lo[i], s.hi[i]))
+            self.assertEqual(s.hist[i].sum(), len(a))
+            # values on bin edges may round into the neighbouring bin in float32
+            self.assertTrue(np.abs(s.hist[i] - hist).sum() <= 2)
+
+    def test_int_attribute(self):
+        # a mean that isn't a whole number, and squares beyond int32
+        a = np.random.RandomState(2).randint(0, 10, 4321).astype(np.int32)
+        self.check(a.reshape(-1,1), attribute_stats(a, 1))
+        self.assertAlmostEqual(attribute_stats(a, 1).var[0], np.var(a.astype(np.float64)))
+
+        big = np.array([0, 100000, 200000, 100000], dtype=np.int32)
+        self.assertAlmostEqual(attribute_stats(big, 1).var[0] / np.var(big.astype(np.float64)), 1.0)
+
+    def test_known_ranges(self):
+        a = np.random.RandomState(3).rand(3000).astype(np.float32)
+        s = attribute_stats(a, 1, bins=10, ranges=[(0.0, 1.0)])
+        self.check(a.reshape(-1,1), s)
+        hist, edges = np.histogram(a, 10, (0.0, 1.0))
+        self.assertTrue(np.abs(s.hist[0] - hist).sum() <= 2)
+
+    def test_empty(self):
+        s = attribute_stats(np.empty(0, np.float32), 3)
+        self.assertEqual(s.n, 0)
+
+    def test_cancelled(self):
+        a = np.zeros(5000, np.float32)
+        self.assertTrue(attribute_stats(a, 1, cancelled=lambda: True) is None)
+
+
+class StatsWorkerTest(unittest.TestCase):
+
+    def wait(self, worker):
+        for i in range(1000):
+            finished, result = worker.poll()
+            if finished:
+                return result
+            time.sleep(0.005)
+        self.fail('stats job never finished')
+
+    def test_latest_result(self):
+        worker = StatsWorker()
+        started = threading.Event()
+        def slow(cancelled):
+            started.set()
+            while not cancelled():
+                time.sleep(0.001)
+            return 'slow'
+        worker.submit(slow)
+        started.wait(5)
+        worker.submit(lambda cancelled: 'fast')
+        self.assertEqual(self.wait(worker), 'fast')
+
+
+if __name__ == '__main__':
+    unittest.main()